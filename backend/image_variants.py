@@ -0,0 +1,30 @@
+"""Image variant rendering, run in the image worker processes
+
+Kept apart from server.py so spawned workers only import PIL, not the app.
+"""
+import io
+
+from PIL import Image, ImageOps
+
+# Resized derivatives generated in the background after an upload. Clients pick
+# one with /api/images/<hash>?size=thumb|medium|full (WebP when accepted, else JPEG).
+IMAGE_VARIANT_WIDTHS = {"thumb": 320, "medium": 800, "full": 1600}
+IMAGE_VARIANT_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+IMAGE_VARIANT_QUALITY = 80
+
+def render_image_variants(data: bytes) -> dict:
+    """Resize an image to every variant width and encode it"""
+    source = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    rendered = {}
+    for size, width in IMAGE_VARIANT_WIDTHS.items():
+        image = source
+        # Never upscale: small uploads keep their original width
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        webp_buffer = io.BytesIO()
+        image.save(webp_buffer, "WEBP", quality=IMAGE_VARIANT_QUALITY, method=4)
+        jpeg_buffer = io.BytesIO()
+        jpeg_image = image.convert("RGB") if image.mode != "RGB" else image
+        jpeg_image.save(jpeg_buffer, "JPEG", quality=IMAGE_VARIANT_QUALITY, optimize=True, progressive=True)
+        rendered[size] = {"webp": webp_buffer.getvalue(), "jpeg": jpeg_buffer.getvalue()}
+    return rendered
@@ -1,19 +1,44 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Query
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+import abc
 import os
+import re
+import json
+import unicodedata
+import asyncio
+import base64
+import binascii
+import bisect
+import time
+import calendar
+import hashlib
+import hmac
+import secrets
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Annotated, Dict, List, Optional, NamedTuple, AsyncIterator
 import uuid
-from datetime import datetime, timezone, timedelta
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from datetime import date, datetime, timezone, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
 import httpx
+import jwt
 from passlib.context import CryptContext
 
+from image_variants import IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_WIDTHS, render_image_variants
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -81,7 +106,7 @@ class Car(BaseModel):
     transmission: str  # manual or automatic
     fuel: str  # diesel, petrol, electric, hybrid
     seats: int
-    images: List[str] = []  # base64 images
+    images: List[str] = []  # image URLs (uploads are stored as /api/images/<hash>)
     main_image_index: int = 0  # index of main image
     pricing: CarPricing
     casco_price: float  # daily CASCO price
@@ -145,6 +170,40 @@ class PriceCalculationResponse(BaseModel):
     outside_hours_fee: float
     total_price: float
     breakdown: dict
+    quote_token: Optional[str] = None  # pass to POST /bookings to book at this price
+
+class PricingTier(BaseModel):
+    min_days: int
+    rate_field: str  # CarPricing field used from min_days on
+
+class SeasonalMultiplier(BaseModel):
+    start: str  # MM-DD
+    end: str  # MM-DD, inclusive
+    multiplier: float = Field(gt=0)
+
+class PricingRules(BaseModel):
+    tiers: List[PricingTier] = [
+        PricingTier(min_days=1, rate_field="day_1"),
+        PricingTier(min_days=3, rate_field="day_3"),
+        PricingTier(min_days=5, rate_field="day_5"),
+        PricingTier(min_days=10, rate_field="day_10"),
+        PricingTier(min_days=20, rate_field="day_20")
+    ]
+    location_fees: Dict[str, Annotated[float, Field(ge=0)]] = {"iasi_airport": 150}  # location -> flat fee
+    business_hours_start: int = Field(9, ge=0, le=24)  # pickups/returns outside [start, end) pay the fee
+    business_hours_end: int = Field(18, ge=0, le=24)
+    outside_hours_fee: float = Field(25, ge=0)  # per pickup/return
+    seasons: List[SeasonalMultiplier] = []  # multiply the daily rate on matching days
+    updated_at: Optional[datetime] = None
+
+class PriceBatchRequest(BaseModel):
+    start_date: str
+    end_date: str
+    start_time: str
+    end_time: str
+    location: str
+    insurance: str
+    car_ids: Optional[List[str]] = None  # all available cars when omitted
 
 class Booking(BaseModel):
     booking_id: str = Field(default_factory=lambda: f"booking_{uuid.uuid4().hex[:12]}")
@@ -177,6 +236,7 @@ class BookingCreate(BaseModel):
     customer_name: str
     customer_phone: str
     customer_age: int
+    quote_token: Optional[str] = None  # from POST /calculate-price
 
 class PartnerRequest(BaseModel):
     request_id: str = Field(default_factory=lambda: f"req_{uuid.uuid4().hex[:12]}")
@@ -253,7 +313,7 @@ class Banner(BaseModel):
     title: str
     subtitle: str = ""
     badge: str = ""
-    image: str  # base64 image
+    image: str  # image URL (uploads are stored as /api/images/<hash>)
     order: int = 0
     active: bool = True
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -296,8 +356,520 @@ class ContactInfoUpdate(BaseModel):
     viber_link: Optional[str] = None
     telegram_link: Optional[str] = None
 
+# ==================== IMAGE STORE ====================
+
+# Images are stored once, keyed by the SHA-256 of their bytes, and documents only
+# keep a reference URL (/api/images/<hash>) instead of the inline base64 payload.
+IMAGE_STORE_BACKEND = os.environ.get('IMAGE_STORE', 'gridfs')  # gridfs or local
+IMAGE_STORE_DIR = Path(os.environ.get('IMAGE_STORE_DIR', str(ROOT_DIR / 'uploads' / 'images')))
+IMAGE_ROUTE_PREFIX = "/api/images/"
+IMAGE_CHUNK_SIZE = 256 * 1024
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+IMAGE_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+DATA_URL_RE = re.compile(r"^data:[\w/+.-]*(;[\w=.-]+)*;base64,", re.IGNORECASE)
+
+class StoredImage(NamedTuple):
+    length: int
+    content_type: str
+    chunks: AsyncIterator[bytes]
+
+def sniff_image_type(data: bytes) -> Optional[str]:
+    """Detect the image MIME type from its magic bytes"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+class ImageStore(abc.ABC):
+    """Content-addressed image storage, keyed by the SHA-256 hex digest of the bytes"""
+
+    @abc.abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether an image with this hash is stored"""
+
+    @abc.abstractmethod
+    async def write(self, key: str, data: bytes) -> None:
+        """Store bytes under their hash"""
+
+    @abc.abstractmethod
+    async def open(self, key: str) -> Optional[StoredImage]:
+        """Open a stored image for streaming (None if it is missing)"""
+
+    async def put(self, data: bytes) -> str:
+        """Store bytes (once) and return their content hash"""
+        key = hashlib.sha256(data).hexdigest()
+        if not await self.exists(key):
+            await self.write(key, data)
+        return key
+
+    async def read(self, key: str) -> Optional[bytes]:
+        """Read a whole image into memory"""
+        stored = await self.open(key)
+        if not stored:
+            return None
+        return b"".join([chunk async for chunk in stored.chunks])
+
+class GridFSImageStore(ImageStore):
+    """Image store backed by a GridFS bucket in the application database"""
+
+    def __init__(self, database):
+        self.bucket = AsyncIOMotorGridFSBucket(database, bucket_name="images")
+        self.files = database["images.files"]
+
+    async def exists(self, key: str) -> bool:
+        return await self.files.find_one({"filename": key}, {"_id": 1}) is not None
+
+    async def write(self, key: str, data: bytes) -> None:
+        content_type = sniff_image_type(data) or "application/octet-stream"
+        await self.bucket.upload_from_stream(key, data, metadata={"content_type": content_type})
+
+    async def open(self, key: str) -> Optional[StoredImage]:
+        try:
+            grid_out = await self.bucket.open_download_stream_by_name(key)
+        except NoFile:
+            return None
+
+        async def chunks():
+            while True:
+                chunk = await grid_out.readchunk()
+                if not chunk:
+                    break
+                yield chunk
+
+        metadata = grid_out.metadata or {}
+        content_type = metadata.get("content_type", "application/octet-stream")
+        return StoredImage(grid_out.length, content_type, chunks())
+
+class LocalImageStore(ImageStore):
+    """Image store backed by a local directory, sharded by the first two hash characters"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).exists)
+
+    async def write(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write_file, self._path(key), data)
+
+    @staticmethod
+    def _write_file(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so readers never see a partial image
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    async def open(self, key: str) -> Optional[StoredImage]:
+        path = self._path(key)
+        try:
+            handle = await asyncio.to_thread(path.open, "rb")
+        except FileNotFoundError:
+            return None
+
+        length = os.fstat(handle.fileno()).st_size
+        head = await asyncio.to_thread(handle.read, 12)
+        await asyncio.to_thread(handle.seek, 0)
+
+        async def chunks():
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(handle.read, IMAGE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                handle.close()
+
+        content_type = sniff_image_type(head) or "application/octet-stream"
+        return StoredImage(length, content_type, chunks())
+
+if IMAGE_STORE_BACKEND == "local":
+    image_store: ImageStore = LocalImageStore(IMAGE_STORE_DIR)
+else:
+    image_store = GridFSImageStore(db)
+
+def image_ref_url(key: str) -> str:
+    """Path under which a stored image is served; clients resolve it against the API host"""
+    return f"{IMAGE_ROUTE_PREFIX}{key}"
+
+UNSUPPORTED_IMAGE_MESSAGE = "Format de imagine neacceptat. Folosiți JPEG, PNG, GIF sau WebP"
+
+def decode_inline_image(value: str) -> Optional[bytes]:
+    """Decode a base64 image (data URL or bare base64); None for URLs
+    
+    Anything that is not a URL must be a JPEG, PNG, GIF or WebP image, otherwise 400,
+    so uploads are never kept inline in the documents.
+    """
+    if not value or value.startswith(("http://", "https://", "/")):
+        return None
+    match = DATA_URL_RE.match(value)
+    payload = value[match.end():] if match else value
+    try:
+        data = base64.b64decode(payload)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_IMAGE_MESSAGE)
+    if not sniff_image_type(data):
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_IMAGE_MESSAGE)
+    return data
+
+async def store_inline_image(value: str) -> str:
+    """Move an inline base64 image into the image store and return its reference path"""
+    key = image_key_from_ref(value)
+    if key and not value.startswith(IMAGE_ROUTE_PREFIX) and await image_store.exists(key):
+        # References stored with a host baked in (IMAGE_BASE_URL) become host-independent
+        return image_ref_url(key)
+    data = decode_inline_image(value)
+    if data is None:
+        return value
+    key = await image_store.put(data)
+    return image_ref_url(key)
+
+async def store_inline_images(values: List[str]) -> List[str]:
+    return [await store_inline_image(value) for value in values]
+
+async def migrate_inline_image(value: str) -> str:
+    """Like store_inline_image, but unsupported images already in the database are left in place"""
+    try:
+        return await store_inline_image(value)
+    except HTTPException:
+        logger.warning(f"Unsupported inline image left in place: {value[:40]}...")
+        return value
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+async def migrate_inline_images():
+    """Move base64 images still embedded in documents into the image store and queue their variants"""
+    migrated_cars = 0
+    async for car in db.cars.find({}, {"_id": 0, "car_id": 1, "images": 1}):
+        images = car.get("images") or []
+        stored = [await migrate_inline_image(image) for image in images]
+        if stored != images:
+            await db.cars.update_one({"car_id": car["car_id"]}, {"$set": {"images": stored}})
+            catalog_changed()
+            migrated_cars += 1
+        schedule_image_variants(stored)
+
+    migrated_bookings = 0
+    async for booking in db.bookings.find(
+        {"car_image": {"$regex": "^(data:|https?://.*/api/images/)"}},
+        {"_id": 0, "booking_id": 1, "car_image": 1}
+    ):
+        car_image = await migrate_inline_image(booking["car_image"])
+        if car_image != booking["car_image"]:
+            await db.bookings.update_one({"booking_id": booking["booking_id"]}, {"$set": {"car_image": car_image}})
+            migrated_bookings += 1
+
+    migrated_banners = 0
+    async for banner in db.banners.find({}, {"_id": 0, "banner_id": 1, "image": 1}):
+        image = await migrate_inline_image(banner.get("image") or "")
+        if image != banner.get("image"):
+            await db.banners.update_one({"banner_id": banner["banner_id"]}, {"$set": {"image": image}})
+            content_versions.bump("banners")
+            migrated_banners += 1
+        schedule_image_variants([image])
+
+    if migrated_cars or migrated_bookings or migrated_banners:
+        logger.info(
+            f"Moved inline images to the image store: {migrated_cars} cars, "
+            f"{migrated_bookings} bookings, {migrated_banners} banners"
+        )
+
+# ==================== IMAGE VARIANTS ====================
+
+# Rendering lives in image_variants.py so the spawned workers do not import this module
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+
+image_process_pool: Optional[ProcessPoolExecutor] = None
+image_variant_index: dict = {}  # image hash -> {size: {format: variant hash}}
+background_tasks: set = set()
+
+def image_key_from_ref(value: str) -> Optional[str]:
+    """Extract the content hash from an /api/images/<hash> reference URL"""
+    if not value or IMAGE_ROUTE_PREFIX not in value:
+        return None
+    key = value.split(IMAGE_ROUTE_PREFIX, 1)[1].split("?", 1)[0]
+    return key if IMAGE_HASH_RE.match(key) else None
+
+async def get_image_variants(key: str) -> Optional[dict]:
+    """Look up the generated variants of an image (None until processing finishes)"""
+    variants = image_variant_index.get(key)
+    if variants is None:
+        doc = await db.image_variants.find_one({"image": key}, {"_id": 0, "variants": 1})
+        if not doc:
+            return None
+        variants = image_variant_index[key] = doc["variants"]
+    return variants
+
+async def generate_image_variants(key: str):
+    """Render and store all variants of a stored image"""
+    if await get_image_variants(key) is not None:
+        return
+    data = await image_store.read(key)
+    if data is None:
+        return
+    
+    loop = asyncio.get_running_loop()
+    try:
+        rendered = await loop.run_in_executor(image_process_pool, render_image_variants, data)
+    except Exception as e:
+        logger.error(f"Image variant generation failed for {key}: {e}")
+        return
+    
+    variants = {}
+    for size, encoded in rendered.items():
+        variants[size] = {fmt: await image_store.put(blob) for fmt, blob in encoded.items()}
+    
+    await db.image_variants.update_one(
+        {"image": key},
+        {"$set": {"variants": variants, "created_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    image_variant_index[key] = variants
+
+def image_variant_url(ref: str, size: str) -> str:
+    """URL of a resized variant for stored images; other URLs are returned unchanged"""
+    if not image_key_from_ref(ref):
+        return ref
+    return f"{ref.split('?', 1)[0]}?size={size}"
+
+def schedule_image_variants(refs: List[str]):
+    """Queue background variant generation for freshly stored images"""
+    for ref in refs:
+        key = image_key_from_ref(ref)
+        if key and key not in image_variant_index:
+            task = asyncio.create_task(generate_image_variants(key))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+
+def start_image_workers():
+    global image_process_pool
+    # Spawned workers avoid forking a process that already runs Mongo client threads
+    image_process_pool = ProcessPoolExecutor(
+        max_workers=IMAGE_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+def stop_image_workers():
+    if image_process_pool:
+        image_process_pool.shutdown(wait=False, cancel_futures=True)
+
+# ==================== CACHING ====================
+
+class LRUCache:
+    """Bounded LRU cache with an optional TTL and hit/miss counters
+    
+    Callers read `generation` before computing a value and pass it back to `set`;
+    every invalidation bumps it, so a value computed before an invalidation is not
+    cached after it.
+    """
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()  # key -> (expires_at or None, value)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key, value, generation: int, ttl: Optional[float] = None):
+        if generation != self.generation:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        self.entries[key] = (None if ttl is None else time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, match=None):
+        """Drop every entry, or only those for which match(key, value) is true"""
+        self.generation += 1
+        if match is None:
+            self.entries.clear()
+        else:
+            for key in [key for key, (_, value) in self.entries.items() if match(key, value)]:
+                del self.entries[key]
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+        if self.ttl is not None:
+            stats["ttl"] = self.ttl
+        return stats
+
 # ==================== AUTH HELPERS ====================
 
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', '2'))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get('PASSWORD_QUEUE_LIMIT', '32'))
+PASSWORD_BUSY_MESSAGE = "Serverul este ocupat. Încercați din nou în câteva secunde."
+
+class PasswordHasher:
+    """Runs bcrypt in a small thread pool so it never blocks the event loop
+    
+    bcrypt releases the GIL, so the threads hash in parallel with the loop. At most
+    workers + queue_limit calls are admitted; the rest get a fast 503 instead of
+    piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_ms = deque(maxlen=1000)  # recent queue waits
+        self.run_ms = deque(maxlen=1000)  # recent bcrypt times
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail=PASSWORD_BUSY_MESSAGE, headers={"Retry-After": "1"})
+        self.in_flight += 1
+        queued_at = time.perf_counter()
+        
+        def timed():
+            started_at = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.wait_ms.append((started_at - queued_at) * 1000)
+                self.run_ms.append((time.perf_counter() - started_at) * 1000)
+        
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, timed)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self.run(pwd_context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str):
+        """(valid, new hash or None); a new hash is returned when the cost is off target"""
+        return await self.run(pwd_context.verify_and_update, password, hashed)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def percentiles(samples) -> dict:
+        ordered = sorted(samples)
+        if not ordered:
+            return {"p50": None, "p95": None, "max": None}
+        return {
+            "p50": round(ordered[len(ordered) // 2], 1),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+            "max": round(ordered[-1], 1)
+        }
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms": self.percentiles(self.wait_ms),
+            "run_ms": self.percentiles(self.run_ms)
+        }
+
+password_hasher = PasswordHasher(PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+BCRYPT_TARGET_MS = float(os.environ.get('BCRYPT_TARGET_MS', '250'))
+BCRYPT_MIN_ROUNDS = int(os.environ.get('BCRYPT_MIN_ROUNDS', '10'))
+BCRYPT_MAX_ROUNDS = int(os.environ.get('BCRYPT_MAX_ROUNDS', '14'))
+BCRYPT_ROUNDS = os.environ.get('BCRYPT_ROUNDS')  # pins the cost and skips calibration
+
+class BcryptCalibration:
+    """Picks the bcrypt cost whose hash time fits BCRYPT_TARGET_MS on this machine
+    
+    Each extra round doubles the work, so one benchmark at the minimum cost predicts
+    the rest. Hashes stored with another cost are upgraded on the next login.
+    """
+
+    def __init__(self):
+        self.rounds = None
+        self.benchmark_ms: dict = {}  # rounds -> measured hash time
+        self.rehashed = 0
+
+    @staticmethod
+    def measure(rounds: int) -> float:
+        handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+        started_at = time.perf_counter()
+        handler.hash("calibration")
+        return (time.perf_counter() - started_at) * 1000
+
+    def choose_rounds(self) -> int:
+        if BCRYPT_ROUNDS:
+            return int(BCRYPT_ROUNDS)
+        base_ms = self.measure(BCRYPT_MIN_ROUNDS)
+        self.benchmark_ms[BCRYPT_MIN_ROUNDS] = round(base_ms, 1)
+        rounds = BCRYPT_MIN_ROUNDS
+        while rounds < BCRYPT_MAX_ROUNDS and base_ms * 2 ** (rounds + 1 - BCRYPT_MIN_ROUNDS) <= BCRYPT_TARGET_MS:
+            rounds += 1
+        if rounds not in self.benchmark_ms:
+            self.benchmark_ms[rounds] = round(self.measure(rounds), 1)
+        return rounds
+
+    async def calibrate(self):
+        rounds = await asyncio.get_running_loop().run_in_executor(password_hasher.pool, self.choose_rounds)
+        pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+        self.rounds = rounds
+        logger.info(f"bcrypt cost {rounds} (benchmark ms: {self.benchmark_ms}, target {BCRYPT_TARGET_MS} ms)")
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "target_ms": BCRYPT_TARGET_MS,
+            "pinned": bool(BCRYPT_ROUNDS),
+            "benchmark_ms": {str(rounds): ms for rounds, ms in self.benchmark_ms.items()},
+            "rehashed": self.rehashed
+        }
+
+bcrypt_calibration = BcryptCalibration()
+
 async def get_session_token(request: Request) -> Optional[str]:
     """Extract session token from cookies or Authorization header"""
     # Try cookies first
@@ -312,12 +884,369 @@ async def get_session_token(request: Request) -> Optional[str]:
     
     return None
 
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', '10000'))
+SESSION_CACHE_TTL = int(os.environ.get('SESSION_CACHE_TTL', '60'))  # seconds
+
+class SessionCache(LRUCache):
+    """LRU cache of session token -> user with a short TTL
+    
+    Entries never outlive the session itself. Logout, account deletion and profile
+    changes invalidate entries explicitly, so the TTL only bounds how long changes
+    made directly in the database take to show up.
+    """
+
+    def set(self, session_token: str, user: User, expires_at: datetime, generation: int):
+        ttl = min(self.ttl, (expires_at - datetime.now(timezone.utc)).total_seconds())
+        super().set(session_token, user, generation, ttl)
+
+    def invalidate_token(self, session_token: str):
+        self.invalidate(lambda token, user: token == session_token)
+
+    def invalidate_user(self, user_id: str):
+        self.invalidate(lambda token, user: user.user_id == user_id)
+
+session_cache = SessionCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL)
+
+# opaque: sess_<uuid> tokens looked up in user_sessions
+# jwt: tokens signed with JWT_SECRET, verified without touching the database
+SESSION_TOKEN_MODE = os.environ.get('SESSION_TOKEN_MODE', 'opaque')
+JWT_SECRET = os.environ.get('JWT_SECRET')
+JWT_ALGORITHM = "HS256"
+SESSION_DAYS = 7
+REVOCATION_REFRESH_SECONDS = int(os.environ.get('REVOCATION_REFRESH_SECONDS', '30'))
+
+if SESSION_TOKEN_MODE not in ("opaque", "jwt"):
+    raise RuntimeError(f"Unknown SESSION_TOKEN_MODE: {SESSION_TOKEN_MODE}")
+if SESSION_TOKEN_MODE == "jwt" and not JWT_SECRET:
+    raise RuntimeError("SESSION_TOKEN_MODE=jwt requires JWT_SECRET")
+
+class RevocationList:
+    """Revoked signed sessions, mirrored in memory from the revoked_tokens collection
+    
+    Logout revokes one token (by jti), account deletion revokes every token of the user
+    issued until then. Entries expire with the last token they can affect, so the list
+    only holds what is still relevant. Other workers pick up revocations on refresh.
+    """
+
+    def __init__(self):
+        self.token_ids: set = set()
+        self.users: dict = {}  # user_id -> revoked_at (epoch seconds)
+        self.refreshed_at = None
+
+    def is_revoked(self, claims: dict) -> bool:
+        if claims["jti"] in self.token_ids:
+            return True
+        revoked_at = self.users.get(claims["sub"])
+        return revoked_at is not None and claims["iat"] <= revoked_at
+
+    async def revoke_token(self, claims: dict):
+        self.token_ids.add(claims["jti"])
+        # Another worker may have revoked the same token before this one refreshed
+        await db.revoked_tokens.update_one(
+            {"kind": "token", "value": claims["jti"]},
+            {"$set": {"expires_at": datetime.fromtimestamp(claims["exp"], timezone.utc)}},
+            upsert=True
+        )
+
+    async def revoke_user(self, user_id: str):
+        now = datetime.now(timezone.utc)
+        self.users[user_id] = int(now.timestamp())
+        await db.revoked_tokens.update_one(
+            {"kind": "user", "value": user_id},
+            {"$set": {"revoked_at": now, "expires_at": now + timedelta(days=SESSION_DAYS)}},
+            upsert=True
+        )
+
+    async def refresh(self):
+        token_ids, users = set(), {}
+        async for entry in db.revoked_tokens.find({}, {"_id": 0}):
+            if entry["kind"] == "token":
+                token_ids.add(entry["value"])
+            else:
+                revoked_at = entry["revoked_at"]
+                if revoked_at.tzinfo is None:
+                    revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+                users[entry["value"]] = int(revoked_at.timestamp())
+        self.token_ids, self.users = token_ids, users
+        self.refreshed_at = datetime.now(timezone.utc)
+
+    def stats(self) -> dict:
+        return {
+            "mode": SESSION_TOKEN_MODE,
+            "revoked_tokens": len(self.token_ids),
+            "revoked_users": len(self.users),
+            "refreshed_at": self.refreshed_at
+        }
+
+revocation_list = RevocationList()
+
+async def revocation_refresh_loop():
+    """Keep the in-memory revocation list in sync with other workers"""
+    while True:
+        await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+        try:
+            await revocation_list.refresh()
+        except Exception as e:
+            logger.error(f"Revocation list refresh failed: {e}")
+
+async def ensure_revocation_list():
+    await db.revoked_tokens.create_index([("kind", 1), ("value", 1)], unique=True)
+    await db.revoked_tokens.create_index("expires_at", expireAfterSeconds=0)
+    if SESSION_TOKEN_MODE == "jwt":
+        await revocation_list.refresh()
+        task = asyncio.create_task(revocation_refresh_loop())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+SESSION_REAP_INTERVAL = int(os.environ.get('SESSION_REAP_INTERVAL', '3600'))  # seconds
+SESSION_REAP_BATCH = 500
+
+class SessionReaper:
+    """Deletes expired sessions and sessions of users that no longer exist
+    
+    The TTL index removes expired sessions on its own within about a minute; the
+    reaper also catches orphans, and its counters show how much it cleaned up.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.expired_removed = 0
+        self.orphaned_removed = 0
+        self.last_run_at = None
+
+    async def run(self):
+        now = datetime.now(timezone.utc)
+        expired = await db.user_sessions.delete_many({"expires_at": {"$lt": now}})
+        self.expired_removed += expired.deleted_count
+        
+        orphaned_removed = 0
+        user_ids = await db.user_sessions.distinct("user_id")
+        for offset in range(0, len(user_ids), SESSION_REAP_BATCH):
+            batch = user_ids[offset:offset + SESSION_REAP_BATCH]
+            existing = await db.users.distinct("user_id", {"user_id": {"$in": batch}})
+            orphaned = list(set(batch) - set(existing))
+            if orphaned:
+                result = await db.user_sessions.delete_many({"user_id": {"$in": orphaned}})
+                orphaned_removed += result.deleted_count
+        self.orphaned_removed += orphaned_removed
+        
+        self.runs += 1
+        self.last_run_at = now
+        if expired.deleted_count or orphaned_removed:
+            logger.info(f"Session reaper removed {expired.deleted_count} expired and {orphaned_removed} orphaned sessions")
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "expired_removed": self.expired_removed,
+            "orphaned_removed": self.orphaned_removed
+        }
+
+session_reaper = SessionReaper()
+
+async def session_reaper_loop():
+    while True:
+        try:
+            await session_reaper.run()
+        except Exception as e:
+            logger.error(f"Session reaper failed: {e}")
+        await asyncio.sleep(SESSION_REAP_INTERVAL)
+
+async def ensure_session_indexes():
+    """Indexes for session lookups, and expiry of old sessions by MongoDB itself"""
+    await db.user_sessions.create_index("session_token")
+    await db.user_sessions.create_index("user_id")
+    await db.user_sessions.create_index("expires_at", expireAfterSeconds=0)
+    task = asyncio.create_task(session_reaper_loop())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+def issue_session_token(user: dict, default: Optional[str] = None) -> str:
+    """New session token for a user: signed in jwt mode, otherwise default or sess_<uuid>"""
+    if SESSION_TOKEN_MODE != "jwt":
+        return default or f"sess_{uuid.uuid4().hex}"
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": user["user_id"],
+        "role": user.get("role", "user"),
+        "is_admin": user.get("is_admin", False),
+        "jti": uuid.uuid4().hex,
+        "iat": int(now.timestamp()),
+        "exp": int((now + timedelta(days=SESSION_DAYS)).timestamp())
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+async def store_session(user_id: str, session_token: str):
+    """Record an opaque session in user_sessions; signed tokens need no database row"""
+    if SESSION_TOKEN_MODE == "jwt":
+        return
+    await db.user_sessions.insert_one({
+        "user_id": user_id,
+        "session_token": session_token,
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=SESSION_DAYS),
+        "created_at": datetime.now(timezone.utc)
+    })
+
+def decode_session_token(session_token: str) -> Optional[dict]:
+    """Claims of a valid, unrevoked signed session token"""
+    try:
+        claims = jwt.decode(
+            session_token,
+            JWT_SECRET,
+            algorithms=[JWT_ALGORITHM],
+            options={"require": ["sub", "jti", "iat", "exp"]}
+        )
+    except jwt.PyJWTError:
+        return None
+    if revocation_list.is_revoked(claims):
+        return None
+    return claims
+
+async def revoke_session_token(session_token: str):
+    """Revoke a signed session token (no-op for opaque tokens)"""
+    if SESSION_TOKEN_MODE == "jwt":
+        claims = decode_session_token(session_token)
+        if claims:
+            await revocation_list.revoke_token(claims)
+
+async def revoke_user_sessions(user_id: str):
+    """Revoke every session of a user"""
+    await db.user_sessions.delete_many({"user_id": user_id})
+    session_cache.invalidate_user(user_id)
+    if SESSION_TOKEN_MODE == "jwt":
+        await revocation_list.revoke_user(user_id)
+
+EMERGENT_AUTH_URL = os.environ.get(
+    'EMERGENT_AUTH_URL',
+    'https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data'
+)
+AUTH_HTTP_TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+AUTH_HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+
+# Shared for the app's lifetime so connections (and TLS sessions) are reused
+auth_http_client: Optional[httpx.AsyncClient] = None
+
+class CircuitBreaker:
+    """Fails fast while an upstream service keeps failing
+    
+    Closed: calls go through and outcomes are recorded in a sliding window. Once at
+    least min_calls outcomes are recorded and the failure rate reaches the threshold
+    the circuit opens and calls are refused for open_seconds. Then one trial call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_threshold: float = 0.5, open_seconds: float = 30):
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.trial_started_at = 0.0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            # A trial that never reported back (e.g. cancelled) does not block forever
+            if self.trial_in_flight and time.monotonic() - self.trial_started_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.trial_in_flight = True
+            self.trial_started_at = time.monotonic()
+        return True
+
+    def retry_after(self) -> int:
+        return max(1, int(self.open_seconds - (time.monotonic() - self.opened_at)))
+
+    def record(self, success: bool):
+        if self.state == "half_open":
+            self.trial_in_flight = False
+            if success:
+                self.state = "closed"
+                self.outcomes.clear()
+            else:
+                self._open()
+            return
+        self.outcomes.append(success)
+        failures = self.outcomes.count(False)
+        if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "recent_calls": len(self.outcomes),
+            "recent_failures": self.outcomes.count(False),
+            "rejected": self.rejected,
+            "times_opened": self.times_opened
+        }
+
+auth_circuit = CircuitBreaker()
+
+def start_auth_http_client():
+    global auth_http_client
+    auth_http_client = httpx.AsyncClient(timeout=AUTH_HTTP_TIMEOUT, limits=AUTH_HTTP_LIMITS)
+
+async def stop_auth_http_client():
+    if auth_http_client is not None:
+        await auth_http_client.aclose()
+
+def user_response(user: dict) -> dict:
+    """User document as returned by the auth endpoints"""
+    return {k: v for k, v in user.items() if k not in ("_id", "password")}
+
+unique_user_fields: set = set()  # user fields protected by a unique index
+
+async def ensure_user_indexes():
+    """Unique phone and email, so concurrent sign-ups cannot create duplicate accounts"""
+    await db.users.create_index("user_id", unique=True)
+    for field in ["phone", "email"]:
+        try:
+            # Google accounts have no phone; only non-empty values must be unique
+            await db.users.create_index(field, unique=True, partialFilterExpression={field: {"$gt": ""}})
+            unique_user_fields.add(field)
+        except OperationFailure as e:
+            logger.error(
+                f"Could not create unique index on users.{field} (existing duplicates?): {e}. "
+                f"Registration falls back to checking {field} before inserting."
+            )
+
 async def get_current_user(request: Request) -> Optional[User]:
     """Get current user from session token"""
     session_token = await get_session_token(request)
     if not session_token:
         return None
     
+    if SESSION_TOKEN_MODE == "jwt":
+        # Everything auth checks need is in the token; the rest is read where needed
+        claims = decode_session_token(session_token)
+        if not claims:
+            return None
+        return User(
+            user_id=claims["sub"],
+            name="",
+            role=claims.get("role", "user"),
+            is_admin=claims.get("is_admin", False)
+        )
+    
+    user = session_cache.get(session_token)
+    if user is not None:
+        return user
+    generation = session_cache.generation
+    
     session = await db.user_sessions.find_one(
         {"session_token": session_token},
         {"_id": 0}
@@ -338,7 +1267,9 @@ async def get_current_user(request: Request) -> Optional[User]:
         {"_id": 0}
     )
     if user_doc:
-        return User(**user_doc)
+        user = User(**user_doc)
+        session_cache.set(session_token, user, expires_at, generation)
+        return user
     return None
 
 async def require_auth(request: Request) -> User:
@@ -360,19 +1291,14 @@ async def require_admin(request: Request) -> User:
 @api_router.post("/auth/register")
 async def register(data: UserRegister, response: Response):
     """Register a new user with phone/email/password"""
-    # Check if phone already exists
-    existing_user = await db.users.find_one({"phone": data.phone})
-    if existing_user:
+    # Fields without their unique index are checked up front
+    if "phone" not in unique_user_fields and await db.users.find_one({"phone": data.phone}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Numărul de telefon este deja înregistrat")
-    
-    # Check if email already exists
-    if data.email:
-        existing_email = await db.users.find_one({"email": data.email})
-        if existing_email:
-            raise HTTPException(status_code=400, detail="Email-ul este deja înregistrat")
+    if data.email and "email" not in unique_user_fields and await db.users.find_one({"email": data.email}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail="Email-ul este deja înregistrat")
     
     # Hash password
-    hashed_password = pwd_context.hash(data.password)
+    hashed_password = await password_hasher.hash(data.password)
     
     # Create user
     user_id = f"user_{uuid.uuid4().hex[:12]}"
@@ -388,21 +1314,17 @@ async def register(data: UserRegister, response: Response):
         "auth_type": "phone",
         "created_at": datetime.now(timezone.utc)
     }
-    await db.users.insert_one(new_user)
+    # The unique indexes reject an existing phone or email
+    try:
+        await db.users.insert_one(new_user)
+    except DuplicateKeyError as e:
+        if "email" in (e.details or {}).get("keyPattern", {}):
+            raise HTTPException(status_code=400, detail="Email-ul este deja înregistrat")
+        raise HTTPException(status_code=400, detail="Numărul de telefon este deja înregistrat")
     
     # Create session
-    session_token = f"sess_{uuid.uuid4().hex}"
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
-    session = {
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": expires_at,
-        "created_at": datetime.now(timezone.utc)
-    }
-    await db.user_sessions.insert_one(session)
-    
-    # Get user data (without password)
-    user_doc = await db.users.find_one({"user_id": user_id}, {"_id": 0, "password": 0})
+    session_token = issue_session_token(new_user)
+    await store_session(user_id, session_token)
     
     # Set cookie
     response.set_cookie(
@@ -415,7 +1337,7 @@ async def register(data: UserRegister, response: Response):
         path="/"
     )
     
-    return {"user": user_doc, "session_token": session_token}
+    return {"user": user_response(new_user), "session_token": session_token}
 
 @api_router.post("/auth/login")
 async def login(data: UserLogin, response: Response):
@@ -430,22 +1352,21 @@ async def login(data: UserLogin, response: Response):
         raise HTTPException(status_code=401, detail="Acest cont folosește autentificarea Google. Folosiți butonul 'Continuă cu Google'.")
     
     # Verify password
-    if not pwd_context.verify(data.password, user["password"]):
+    valid, new_hash = await password_hasher.verify_and_update(data.password, user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Număr de telefon sau parolă incorectă")
     
-    # Create session
-    session_token = f"sess_{uuid.uuid4().hex}"
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
-    session = {
-        "user_id": user["user_id"],
-        "session_token": session_token,
-        "expires_at": expires_at,
-        "created_at": datetime.now(timezone.utc)
-    }
-    await db.user_sessions.insert_one(session)
+    # Upgrade hashes made with another bcrypt cost while the password is at hand
+    if new_hash:
+        await db.users.update_one(
+            {"user_id": user["user_id"], "password": user["password"]},
+            {"$set": {"password": new_hash}}
+        )
+        bcrypt_calibration.rehashed += 1
     
-    # Get user data (without password)
-    user_doc = await db.users.find_one({"user_id": user["user_id"]}, {"_id": 0, "password": 0})
+    # Create session
+    session_token = issue_session_token(user)
+    await store_session(user["user_id"], session_token)
     
     # Set cookie
     response.set_cookie(
@@ -458,7 +1379,7 @@ async def login(data: UserLogin, response: Response):
         path="/"
     )
     
-    return {"user": user_doc, "session_token": session_token}
+    return {"user": user_response(user), "session_token": session_token}
 
 @api_router.post("/auth/session")
 async def create_session(request: Request, response: Response):
@@ -470,19 +1391,32 @@ async def create_session(request: Request, response: Response):
         raise HTTPException(status_code=400, detail="session_id required")
     
     # Call Emergent Auth API
-    async with httpx.AsyncClient() as client:
-        try:
-            auth_response = await client.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers={"X-Session-ID": session_id}
-            )
-            if auth_response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid session_id")
-            
-            user_data = auth_response.json()
-        except Exception as e:
-            logger.error(f"Auth API error: {e}")
-            raise HTTPException(status_code=500, detail="Authentication failed")
+    if not auth_circuit.allow():
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication service unavailable",
+            headers={"Retry-After": str(auth_circuit.retry_after())}
+        )
+    try:
+        auth_response = await auth_http_client.get(
+            EMERGENT_AUTH_URL,
+            headers={"X-Session-ID": session_id}
+        )
+    except httpx.HTTPError as e:
+        auth_circuit.record(False)
+        logger.error(f"Auth API error: {e}")
+        raise HTTPException(status_code=500, detail="Authentication failed")
+    
+    # Rejected session IDs are the caller's problem, not an upstream failure
+    auth_circuit.record(auth_response.status_code < 500)
+    if auth_response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid session_id")
+    
+    try:
+        user_data = auth_response.json()
+    except ValueError as e:
+        logger.error(f"Auth API error: {e}")
+        raise HTTPException(status_code=500, detail="Authentication failed")
     
     session_data = SessionDataResponse(**user_data)
     
@@ -492,38 +1426,33 @@ async def create_session(request: Request, response: Response):
         {"_id": 0}
     )
     
-    if existing_user:
-        user_id = existing_user["user_id"]
-    else:
+    if not existing_user:
         # Create new user
-        user_id = f"user_{uuid.uuid4().hex[:12]}"
         new_user = {
-            "user_id": user_id,
+            "user_id": f"user_{uuid.uuid4().hex[:12]}",
             "email": session_data.email,
             "name": session_data.name,
             "picture": session_data.picture,
             "role": "user",
             "created_at": datetime.now(timezone.utc)
         }
-        await db.users.insert_one(new_user)
+        try:
+            await db.users.insert_one(new_user)
+            existing_user = new_user
+        except DuplicateKeyError:
+            # Signed up concurrently with the same email
+            existing_user = await db.users.find_one({"email": session_data.email}, {"_id": 0})
     
-    # Create session
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
-    session = {
-        "user_id": user_id,
-        "session_token": session_data.session_token,
-        "expires_at": expires_at,
-        "created_at": datetime.now(timezone.utc)
-    }
-    await db.user_sessions.insert_one(session)
+    user_id = existing_user["user_id"]
+    session_token = issue_session_token(existing_user, session_data.session_token)
     
-    # Get user data
-    user_doc = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+    # Create session
+    await store_session(user_id, session_token)
     
     # Set cookie
     response.set_cookie(
         key="session_token",
-        value=session_data.session_token,
+        value=session_token,
         httponly=True,
         secure=True,
         samesite="none",
@@ -531,7 +1460,7 @@ async def create_session(request: Request, response: Response):
         path="/"
     )
     
-    return {"user": user_doc, "session_token": session_data.session_token}
+    return {"user": user_response(existing_user), "session_token": session_token}
 
 @api_router.get("/auth/me")
 async def get_me(request: Request):
@@ -539,6 +1468,12 @@ async def get_me(request: Request):
     user = await get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    if SESSION_TOKEN_MODE == "jwt":
+        # Signed tokens only carry the fields auth checks need
+        user_doc = await db.users.find_one({"user_id": user.user_id}, {"_id": 0})
+        if not user_doc:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        user = User(**user_doc)
     return user.model_dump()
 
 @api_router.post("/auth/logout")
@@ -547,6 +1482,8 @@ async def logout(request: Request, response: Response):
     session_token = await get_session_token(request)
     if session_token:
         await db.user_sessions.delete_many({"session_token": session_token})
+        session_cache.invalidate_token(session_token)
+        await revoke_session_token(session_token)
     
     response.delete_cookie(key="session_token", path="/")
     return {"message": "Logged out successfully"}
@@ -563,7 +1500,7 @@ async def delete_account(request: Request, response: Response):
         raise HTTPException(status_code=400, detail="Nu poți șterge un cont de administrator")
     
     # Delete user sessions
-    await db.user_sessions.delete_many({"user_id": user.user_id})
+    await revoke_user_sessions(user.user_id)
     
     # Delete user account
     await db.users.delete_one({"user_id": user.user_id})
@@ -582,6 +1519,7 @@ async def update_profile_picture(data: ProfilePictureUpdate, request: Request):
         {"user_id": user.user_id},
         {"$set": {"picture": data.picture}}
     )
+    session_cache.invalidate_user(user.user_id)
     
     return {"message": "Poza de profil a fost actualizată"}
 
@@ -594,6 +1532,7 @@ async def update_name(data: NameUpdate, request: Request):
         {"user_id": user.user_id},
         {"$set": {"name": data.name}}
     )
+    session_cache.invalidate_user(user.user_id)
     
     return {"message": "Numele a fost actualizat"}
 
@@ -609,6 +1548,7 @@ async def update_language(data: LanguageUpdate, request: Request):
         {"user_id": user.user_id},
         {"$set": {"language": data.language}}
     )
+    session_cache.invalidate_user(user.user_id)
     
     return {"message": "Limba a fost actualizată"}
 
@@ -618,7 +1558,7 @@ async def add_favorite(car_id: str, request: Request):
     user = await require_auth(request)
     
     # Check if car exists
-    car = await db.cars.find_one({"car_id": car_id})
+    car = await car_loader(request).load(car_id)
     if not car:
         raise HTTPException(status_code=404, detail="Mașina nu a fost găsită")
     
@@ -654,7 +1594,7 @@ async def get_favorites(request: Request):
         return []
     
     # Get full car details
-    cars = await db.cars.find({"car_id": {"$in": favorite_ids}}, {"_id": 0}).to_list(100)
+    cars = await db.cars.find({"car_id": {"$in": favorite_ids}}, CAR_PUBLIC_PROJECTION).to_list(100)
     return cars
 
 # ==================== ADMIN USERS ENDPOINTS ====================
@@ -679,43 +1619,201 @@ async def delete_user(user_id: str, request: Request):
     result = await db.users.delete_one({"user_id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Utilizatorul nu a fost găsit")
+    await revoke_user_sessions(user_id)
     
     return {"message": "Utilizatorul a fost șters"}
 
+ADMIN_STATS_TTL = int(os.environ.get('ADMIN_STATS_TTL', '30'))  # seconds
+BOOKING_STATUSES = ["pending", "confirmed", "completed", "cancelled"]
+PARTNER_REQUEST_STATUSES = ["pending", "contacted", "approved", "rejected"]
+COUNTERS_RECONCILE_INTERVAL = int(os.environ.get('COUNTERS_RECONCILE_INTERVAL', '3600'))  # seconds
+
+# counters document: {"bookings": {"total": n, "by_status": {status: n}}, "partner_requests": {...}}
+COUNTERS_ID = "dashboard"
+COUNTERS_RECONCILE_ATTEMPTS = 3
+COUNTERS_SETTLE_SECONDS = float(os.environ.get('COUNTERS_SETTLE_SECONDS', '5'))
+
+async def count_status_change(kind: str, old_status: Optional[str], new_status: Optional[str]):
+    """Move one document between status counters; None means created or deleted"""
+    if old_status == new_status:
+        return
+    inc = {}
+    if old_status is None:
+        inc[f"{kind}.total"] = 1
+    else:
+        inc[f"{kind}.by_status.{old_status}"] = -1
+    if new_status is None:
+        inc[f"{kind}.total"] = -1
+    else:
+        inc[f"{kind}.by_status.{new_status}"] = 1
+    # Every increment moves the version, so the reconciler can tell it raced with one
+    inc["version"] = 1
+    await db.counters.update_one({"_id": COUNTERS_ID}, {"$inc": inc}, upsert=True)
+
+class CounterReconciler:
+    """Recounts the counters document from scratch and fixes any drift
+    
+    Increments happen after the write they count, so a crash in between, or a change
+    made outside the API, leaves the counters off until the next reconcile.
+    
+    A write whose increment is still in flight is already in the recount, so fixing
+    the drift straight away would count it twice once the increment lands. The fix
+    therefore waits COUNTERS_SETTLE_SECONDS and is only written if no increment landed
+    since the counters were read (their version is unchanged); otherwise the recount
+    is retried. Only a handler stalled longer than that between its write and its
+    increment can still be counted twice, until the next reconcile.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.drift_fixed = 0
+        self.conflicts = 0
+        self.last_run_at = None
+
+    async def count(self, collection) -> dict:
+        rows = await collection.aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}]).to_list(None)
+        by_status = {row["_id"]: row["n"] for row in rows if row["_id"]}
+        return {"total": sum(row["n"] for row in rows), "by_status": by_status}
+
+    @staticmethod
+    def normalized(counters: dict) -> dict:
+        by_status = {status: n for status, n in counters.get("by_status", {}).items() if n}
+        return {"total": counters.get("total", 0), "by_status": by_status}
+
+    async def run(self):
+        for _ in range(COUNTERS_RECONCILE_ATTEMPTS):
+            # Read before counting: an increment after this read changes the version
+            current = await db.counters.find_one({"_id": COUNTERS_ID}, {"_id": 0})
+            counted = {
+                "bookings": await self.count(db.bookings),
+                "partner_requests": await self.count(db.partner_requests)
+            }
+            if current and all(self.normalized(current.get(kind, {})) == counted[kind] for kind in counted):
+                break
+            
+            # Let increments for writes already in the recount land and move the version
+            await asyncio.sleep(COUNTERS_SETTLE_SECONDS)
+            if current is None:
+                try:
+                    await db.counters.insert_one({"_id": COUNTERS_ID, **counted, "version": 1})
+                except DuplicateKeyError:
+                    self.conflicts += 1
+                    continue
+            else:
+                result = await db.counters.replace_one(
+                    {"_id": COUNTERS_ID, "version": current.get("version")},
+                    {**counted, "version": (current.get("version") or 0) + 1}
+                )
+                if result.matched_count == 0:
+                    self.conflicts += 1
+                    continue
+                logger.warning(f"Dashboard counters drifted: {current} -> {counted}")
+                self.drift_fixed += 1
+            admin_stats.invalidate()
+            break
+        
+        self.runs += 1
+        self.last_run_at = datetime.now(timezone.utc)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "drift_fixed": self.drift_fixed,
+            "conflicts": self.conflicts,
+            "last_run_at": self.last_run_at
+        }
+
+counter_reconciler = CounterReconciler()
+
+async def counter_reconcile_loop():
+    while True:
+        await asyncio.sleep(COUNTERS_RECONCILE_INTERVAL)
+        try:
+            await counter_reconciler.run()
+        except Exception as e:
+            logger.error(f"Counter reconcile failed: {e}")
+
+async def ensure_counters():
+    # The dashboard's recent bookings are read newest first
+    await db.bookings.create_index([("created_at", -1)])
+    await counter_reconciler.run()
+    task = asyncio.create_task(counter_reconcile_loop())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+def facet_count(result: dict, name: str) -> int:
+    """Value of a [{"$count": "n"}] facet"""
+    return result[name][0]["n"] if result[name] else 0
+
+class AdminStats(LRUCache):
+    """Dashboard statistics, read from the counters document and cached briefly
+    
+    Booking, car and partner request writes invalidate the cache; the TTL only covers
+    changes nothing invalidates (e.g. new users).
+    """
+
+    def __init__(self, ttl: int):
+        super().__init__(1, ttl)
+
+    async def compute(self) -> dict:
+        counters, recent_bookings, cars, total_users = await asyncio.gather(
+            db.counters.find_one({"_id": COUNTERS_ID}, {"_id": 0}),
+            db.bookings.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5),
+            db.cars.aggregate([{"$facet": {
+                "total": [{"$count": "n"}],
+                "available": [{"$match": {"available": True}}, {"$count": "n"}]
+            }}]).to_list(1),
+            db.users.count_documents({"is_admin": {"$ne": True}})
+        )
+        cars = cars[0]
+        bookings = (counters or {}).get("bookings", {})
+        partners = (counters or {}).get("partner_requests", {})
+        
+        booking_stats = {status: bookings.get("by_status", {}).get(status, 0) for status in BOOKING_STATUSES}
+        
+        return {
+            "total_cars": facet_count(cars, "total"),
+            "available_cars": facet_count(cars, "available"),
+            "total_bookings": bookings.get("total", 0),
+            "total_users": total_users,
+            "pending_bookings": booking_stats["pending"],
+            "pending_partners": partners.get("by_status", {}).get("pending", 0),
+            "total_partner_requests": partners.get("total", 0),
+            "booking_stats": booking_stats,
+            "recent_bookings": recent_bookings
+        }
+
+    async def current(self) -> dict:
+        value = self.get("stats")
+        if value is None:
+            generation = self.generation
+            value = await self.compute()
+            self.set("stats", value, generation)
+        return value
+
+admin_stats = AdminStats(ADMIN_STATS_TTL)
+
 @api_router.get("/admin/stats")
 async def get_admin_stats(request: Request):
     """Get dashboard statistics (admin only)"""
     await require_admin(request)
-    
-    # Get counts
-    total_cars = await db.cars.count_documents({})
-    total_bookings = await db.bookings.count_documents({})
-    total_users = await db.users.count_documents({"is_admin": {"$ne": True}})
-    pending_bookings = await db.bookings.count_documents({"status": "pending"})
-    confirmed_bookings = await db.bookings.count_documents({"status": "confirmed"})
-    completed_bookings = await db.bookings.count_documents({"status": "completed"})
-    cancelled_bookings = await db.bookings.count_documents({"status": "cancelled"})
-    pending_partners = await db.partner_requests.count_documents({"status": "pending"})
-    
-    # Get recent bookings
-    recent_bookings = await db.bookings.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
-    
-    # Get booking stats by status for chart
-    booking_stats = {
-        "pending": pending_bookings,
-        "confirmed": confirmed_bookings,
-        "completed": completed_bookings,
-        "cancelled": cancelled_bookings
-    }
-    
+    return await admin_stats.current()
+
+@api_router.get("/admin/metrics")
+async def get_admin_metrics(request: Request):
+    """Get in-process cache and worker metrics (admin only)"""
+    await require_admin(request)
     return {
-        "total_cars": total_cars,
-        "total_bookings": total_bookings,
-        "total_users": total_users,
-        "pending_bookings": pending_bookings,
-        "pending_partners": pending_partners,
-        "booking_stats": booking_stats,
-        "recent_bookings": recent_bookings
+        "catalog_cache": catalog_cache.stats(),
+        "availability": availability.stats(),
+        "quote_cache": quote_cache.stats(),
+        "session_cache": session_cache.stats(),
+        "sessions": revocation_list.stats(),
+        "password_hasher": {**password_hasher.stats(), "bcrypt": bcrypt_calibration.stats()},
+        "session_reaper": session_reaper.stats(),
+        "auth_upstream": auth_circuit.stats(),
+        "admin_stats": admin_stats.stats(),
+        "counters": counter_reconciler.stats()
     }
 
 # ==================== FAQ ENDPOINTS ====================
@@ -733,6 +1831,7 @@ async def create_faq(data: FAQCreate, request: Request):
     await require_admin(request)
     faq = FAQ(**data.model_dump())
     await db.faqs.insert_one(faq.model_dump())
+    content_versions.bump("faqs")
     return faq.model_dump()
 
 @api_router.put("/admin/faqs/{faq_id}")
@@ -745,6 +1844,7 @@ async def update_faq(faq_id: str, data: FAQUpdate, request: Request):
     result = await db.faqs.update_one({"faq_id": faq_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="FAQ not found")
+    content_versions.bump("faqs")
     faq = await db.faqs.find_one({"faq_id": faq_id}, {"_id": 0})
     return faq
 
@@ -755,6 +1855,7 @@ async def delete_faq(faq_id: str, request: Request):
     result = await db.faqs.delete_one({"faq_id": faq_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="FAQ not found")
+    content_versions.bump("faqs")
     return {"message": "FAQ deleted successfully"}
 
 # ==================== LEGAL CONTENT ENDPOINTS ====================
@@ -791,6 +1892,7 @@ async def update_legal_content(content_type: str, data: LegalContentUpdate, requ
         {"$set": content},
         upsert=True
     )
+    content_versions.bump("legal")
     
     return {"message": "Legal content updated successfully"}
 
@@ -827,26 +1929,869 @@ async def update_contacts(data: ContactInfoUpdate, request: Request):
         {"$set": update_data},
         upsert=True
     )
+    content_versions.bump("contacts")
     
     contact = await db.contacts.find_one({}, {"_id": 0})
     return contact
 
-# ==================== CAR ENDPOINTS ====================
+# ==================== IMAGE ENDPOINTS ====================
 
-@api_router.get("/cars")
-async def get_cars(
-    brand: Optional[str] = None,
-    transmission: Optional[str] = None,
-    fuel: Optional[str] = None,
-    body_type: Optional[str] = None,
-    min_seats: Optional[int] = None,
-    available_only: bool = True
+@api_router.get("/images/{image_hash}")
+async def get_image(
+    image_hash: str,
+    request: Request,
+    size: Optional[str] = None,
+    format: Optional[str] = None
 ):
-    """Get all cars with optional filters"""
+    """Stream a stored image or one of its resized variants (public endpoint)"""
+    if not IMAGE_HASH_RE.match(image_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if size is not None and size not in IMAGE_VARIANT_WIDTHS:
+        raise HTTPException(status_code=400, detail="Invalid image size")
+    if format is not None and format not in IMAGE_VARIANT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid image format")
+    
+    cache_control = IMAGE_CACHE_CONTROL
+    vary = None
+    if size:
+        variants = await get_image_variants(image_hash)
+        if variants:
+            if not format:
+                format = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpeg"
+                vary = "Accept"
+            image_hash = variants[size][format]
+        else:
+            # Variants are still being generated - serve the original briefly
+            cache_control = "public, max-age=60"
+    
+    # Content never changes for a given hash, so the hash itself is the ETag
+    etag = f'"{image_hash}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    stored = await image_store.open(image_hash)
+    if not stored:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    headers["Content-Length"] = str(stored.length)
+    return StreamingResponse(stored.chunks, media_type=stored.content_type, headers=headers)
+
+# ==================== CONTENT VERSIONS ====================
+
+# Public content is revalidated with ETags built from per-kind version counters
+# that admin writes move forward. The boot id makes ETags from a previous process
+# (whose counters started over) never match.
+CONTENT_BOOT_ID = uuid.uuid4().hex[:8]
+
+class ContentVersions:
+    """Version counters and modification times for each kind of public content"""
+
+    def __init__(self):
+        self.versions: dict = {}
+        self.modified: dict = {}
+        self.started = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def bump(self, kind: str):
+        self.versions[kind] = self.versions.get(kind, 0) + 1
+        # HTTP dates have one-second precision, so keep them strictly increasing
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        previous = self.modified.get(kind, self.started)
+        self.modified[kind] = max(now, previous + timedelta(seconds=1))
+
+    def etag(self, kinds: tuple, resource: str) -> str:
+        versions = ".".join(str(self.versions.get(kind, 0)) for kind in kinds)
+        digest = hashlib.sha1(resource.encode()).hexdigest()[:12]
+        return f'"{CONTENT_BOOT_ID}-{versions}-{digest}"'
+
+    def last_modified(self, kinds: tuple) -> datetime:
+        return max(self.modified.get(kind, self.started) for kind in kinds)
+
+content_versions = ContentVersions()
+
+# Public GET endpoints covered by conditional requests, with the content they depend on
+CONDITIONAL_GET_ROUTES = [
+    (re.compile(r"^/api/cars(/[^/]+)?$"), ("cars",)),
+    (re.compile(r"^/api/cars/[^/]+/calendar$"), ("bookings",)),
+    (re.compile(r"^/api/faqs$"), ("faqs",)),
+    (re.compile(r"^/api/banners$"), ("banners",)),
+    (re.compile(r"^/api/legal/[^/]+$"), ("legal",)),
+    (re.compile(r"^/api/contacts$"), ("contacts",)),
+]
+
+def content_kinds_for(path: str, query: str) -> Optional[tuple]:
+    for pattern, kinds in CONDITIONAL_GET_ROUTES:
+        if pattern.match(path):
+            # Date-filtered catalog results also change with bookings
+            if path in ("/api/cars", "/api/cars/facets") and "available_from" in query:
+                return kinds + ("bookings",)
+            return kinds
+    return None
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+# ==================== CATALOG CACHE ====================
+
+CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', '256'))
+
+class CatalogCache(LRUCache):
+    """Versioned LRU cache of serialized catalog responses, cleared on every fleet change"""
+
+    @property
+    def version(self) -> int:
+        return self.generation
+
+    def stats(self) -> dict:
+        return {"version": self.version, **super().stats()}
+
+catalog_cache = CatalogCache(CATALOG_CACHE_SIZE)
+
+# ==================== CATALOG ORDERING ====================
+
+# Cars without a display order go last, after every explicitly ordered car
+CAR_ORDER_LAST = 999
+CARS_PAGE_MAX = 500
+CAR_SORT_SPEC = {"order": 1, "name": 1, "car_id": 1}
+
+def encode_car_cursor(car: dict) -> str:
+    """Opaque keyset cursor pointing just after the given car"""
+    position = [car.get("order"), car.get("name"), car["car_id"]]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+def decode_car_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, list) or len(position) != 3:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+def cursor_filter(position: list) -> List[dict]:
+    """Keyset condition selecting cars sorted after the cursor position"""
+    order, name, car_id = position
+    return [
+        {"order": {"$gt": order}},
+        {"order": order, "name": {"$gt": name}},
+        {"order": order, "name": name, "car_id": {"$gt": car_id}}
+    ]
+
+def cars_page_response(body: bytes, next_cursor: Optional[str]) -> Response:
+    response = json_bytes_response(body)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+async def ensure_catalog_indexes():
+    """Create the catalog indexes and backfill the fields they rely on"""
+    await db.cars.update_many({"order": None}, {"$set": {"order": CAR_ORDER_LAST}})
+    async for car in db.cars.find({"brand_key": None}, {"_id": 0, "car_id": 1, "brand": 1}):
+        await db.cars.update_one(
+            {"car_id": car["car_id"]},
+            {"$set": {"brand_key": search_key(car.get("brand") or "")}}
+        )
+    await db.cars.create_index("brand_key")
+    await db.cars.create_index("car_id", unique=True)
+    await db.cars.create_index([("available", 1), ("order", 1), ("name", 1), ("car_id", 1)])
+    await db.cars.create_index([("order", 1), ("name", 1), ("car_id", 1)])
+
+def catalog_changed():
+    """Drop cached catalog responses and move the cars content version forward"""
+    catalog_cache.invalidate()
+    content_versions.bump("cars")
+    admin_stats.invalidate()
+
+def render_json(data) -> bytes:
+    """Serialize a response body the same way FastAPI's JSONResponse does"""
+    return JSONResponse(content=jsonable_encoder(data)).body
+
+def json_bytes_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+# ==================== CATALOG SEARCH ====================
+
+SUGGEST_MAX_RESULTS = 10
+
+def search_key(value: str) -> str:
+    """Normalize text for case- and accent-insensitive prefix matching"""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.split())
+
+class PrefixTrie:
+    """Prefix trie whose nodes keep their best completions precomputed"""
+
+    def __init__(self):
+        self.root: dict = {}
+
+    def insert(self, key: str, suggestion: tuple):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault("$terms", set()).add(suggestion)
+
+    def finalize(self, limit: int):
+        """Precompute the top suggestions below every node so lookups are O(len(prefix))"""
+        def collect(node: dict) -> list:
+            found = set(node.get("$terms", ()))
+            for ch, child in node.items():
+                if not ch.startswith("$"):
+                    found.update(collect(child))
+            # Most common suggestions first, then alphabetical
+            best = sorted(found, key=lambda item: (-item[2], item[0]))[:limit]
+            node["$top"] = best
+            return best
+        collect(self.root)
+
+    def search(self, prefix: str) -> list:
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node.get("$top", [])
+
+class CatalogSearch:
+    """Autocomplete over brands, models and names of available cars, rebuilt on catalog changes"""
+
+    def __init__(self):
+        self.trie = PrefixTrie()
+        self.version = None
+
+    async def ensure_current(self):
+        version = catalog_cache.version
+        if self.version == version:
+            return
+        cars = await db.cars.find(
+            {"available": True},
+            {"_id": 0, "brand": 1, "model": 1, "name": 1}
+        ).to_list(None)
+        
+        counts: dict = {}
+        for car in cars:
+            for kind in ("brand", "model", "name"):
+                text = (car.get(kind) or "").strip()
+                if text:
+                    counts[(text, kind)] = counts.get((text, kind), 0) + 1
+        
+        trie = PrefixTrie()
+        for (text, kind), count in counts.items():
+            suggestion = (text, kind, count)
+            key = search_key(text)
+            # Match from the start of every word, e.g. "cla" finds "Mercedes-Benz C-Class"
+            for word in re.finditer(r"\w+", key):
+                trie.insert(key[word.start():], suggestion)
+        trie.finalize(SUGGEST_MAX_RESULTS)
+        
+        self.trie = trie
+        self.version = version
+
+    def suggest(self, query: str, limit: int) -> List[dict]:
+        return [
+            {"text": text, "kind": kind, "count": count}
+            for text, kind, count in self.trie.search(search_key(query))[:limit]
+        ]
+
+catalog_search = CatalogSearch()
+
+# ==================== AVAILABILITY ====================
+
+def booking_day(value: str) -> date:
+    """Calendar day of a booking date string (YYYY-MM-DD or a full ISO timestamp)"""
+    return datetime.fromisoformat(value).date()
+
+# Every rented day becomes a car_slots document, so rentals are capped
+MAX_RENTAL_DAYS = int(os.environ.get('MAX_RENTAL_DAYS', '90'))
+RENTAL_TOO_LONG_MESSAGE = f"Perioada maximă de închiriere este de {MAX_RENTAL_DAYS} de zile"
+
+def parse_date_range(start_date: str, end_date: str) -> tuple:
+    """Inclusive (start, end) day ordinals of a rental, 400 on invalid input"""
+    try:
+        start = booking_day(start_date).toordinal()
+        end = booking_day(end_date).toordinal()
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    if end < start:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return start, end
+
+def availability_filter_range(available_from: Optional[str], available_to: Optional[str]) -> Optional[tuple]:
+    """Day range of the available_from/available_to catalog filter, None when it is off"""
+    if not (available_from or available_to):
+        return None
+    if not (available_from and available_to):
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return parse_date_range(available_from, available_to)
+
+class CarIntervals:
+    """Booked day intervals of one car, sorted by start, with running maximum of ends"""
+
+    def __init__(self):
+        self.entries: List[tuple] = []  # (start, end, booking_id)
+        self.starts: List[int] = []
+        self.max_ends: List[int] = []
+
+    def rebuild(self):
+        self.entries.sort()
+        self.starts = [entry[0] for entry in self.entries]
+        self.max_ends = []
+        running = None
+        for _, end, _ in self.entries:
+            running = end if running is None else max(running, end)
+            self.max_ends.append(running)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        # Intervals starting on or before `end` overlap unless all of them end before `start`
+        idx = bisect.bisect_right(self.starts, end)
+        return idx > 0 and self.max_ends[idx - 1] >= start
+
+MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+def month_segments(start: int, end: int):
+    """Split an inclusive day-ordinal range into (YYYY-MM, first day, last day) pieces"""
+    day = date.fromordinal(start)
+    last = date.fromordinal(end)
+    while day <= last:
+        month_end = date(day.year, day.month, calendar.monthrange(day.year, day.month)[1])
+        segment_end = min(month_end, last)
+        yield f"{day.year:04d}-{day.month:02d}", day.day, segment_end.day
+        day = segment_end + timedelta(days=1)
+
+def day_bits(first: int, last: int) -> int:
+    """Bitmask with bits first-1 .. last-1 set (bit 0 is the 1st of the month)"""
+    return ((1 << (last - first + 1)) - 1) << (first - 1)
+
+class AvailabilityIndex:
+    """In-memory index of the days taken by non-cancelled bookings, per car
+    
+    Besides the interval lists used for range checks, a bitmap of booked days is
+    kept per car and month so the calendar endpoint is a single dict lookup.
+    """
+
+    def __init__(self):
+        self.cars: dict = {}  # car_id -> CarIntervals
+        self.bookings: dict = {}  # booking_id -> (car_id, start, end)
+        self.months: dict = {}  # car_id -> {"YYYY-MM": booked day bitmap}
+        self.version = 0
+
+    async def load(self):
+        """Build the index from the bookings collection"""
+        self.cars = {}
+        self.bookings = {}
+        self.months = {}
+        async for booking in db.bookings.find(
+            {"status": {"$ne": "cancelled"}},
+            {"_id": 0, "booking_id": 1, "car_id": 1, "start_date": 1, "end_date": 1}
+        ):
+            self._insert(booking)
+        for intervals in self.cars.values():
+            intervals.rebuild()
+        self._changed()
+
+    def _insert(self, booking: dict) -> Optional[str]:
+        try:
+            start, end = parse_date_range(booking["start_date"], booking["end_date"])
+        except (HTTPException, KeyError):
+            logger.warning(f"Skipping booking with invalid dates: {booking.get('booking_id')}")
+            return None
+        car_id = booking["car_id"]
+        self.bookings[booking["booking_id"]] = (car_id, start, end)
+        self.cars.setdefault(car_id, CarIntervals()).entries.append((start, end, booking["booking_id"]))
+        self._mark(car_id, start, end)
+        return car_id
+
+    def _mark(self, car_id: str, start: int, end: int):
+        months = self.months.setdefault(car_id, {})
+        for month, first, last in month_segments(start, end):
+            months[month] = months.get(month, 0) | day_bits(first, last)
+
+    def _unmark(self, car_id: str, start: int, end: int):
+        months = self.months.get(car_id, {})
+        for month, first, last in month_segments(start, end):
+            months[month] = months.get(month, 0) & ~day_bits(first, last)
+        # Days of the range may still be taken by another (legacy, overlapping) booking
+        for other_start, other_end, _ in self.cars[car_id].entries:
+            if other_start <= end and other_end >= start:
+                self._mark(car_id, max(start, other_start), min(end, other_end))
+
+    def _changed(self):
+        self.version += 1
+        content_versions.bump("bookings")
+
+    def add(self, booking: dict):
+        """Index a booking (replacing a previous entry with the same id)"""
+        self.remove(booking["booking_id"], notify=False)
+        car_id = self._insert(booking)
+        if car_id:
+            self.cars[car_id].rebuild()
+        self._changed()
+
+    def remove(self, booking_id: str, notify: bool = True):
+        entry = self.bookings.pop(booking_id, None)
+        if entry:
+            car_id, start, end = entry
+            intervals = self.cars[car_id]
+            intervals.entries = [e for e in intervals.entries if e[2] != booking_id]
+            intervals.rebuild()
+            self._unmark(car_id, start, end)
+        if notify:
+            self._changed()
+
+    def is_free(self, car_id: str, start: int, end: int) -> bool:
+        intervals = self.cars.get(car_id)
+        return intervals is None or not intervals.overlaps(start, end)
+
+    def month_bitmap(self, car_id: str, month: str) -> int:
+        return self.months.get(car_id, {}).get(month, 0)
+
+    def busy_cars(self, start: int, end: int) -> List[str]:
+        """Cars with at least one booking overlapping the inclusive day range"""
+        return [car_id for car_id, intervals in self.cars.items() if intervals.overlaps(start, end)]
+
+    def stats(self) -> dict:
+        return {"version": self.version, "cars": len(self.cars), "bookings": len(self.bookings)}
+
+availability = AvailabilityIndex()
+
+# ==================== RESERVATIONS ====================
+
+# Every rented day is claimed with a (car_id, day) slot document under a unique
+# index, so two overlapping bookings can never both be written: the loser's
+# insert fails with a duplicate key and gets a 409.
+DUPLICATE_KEY_ERROR = 11000
+UNAVAILABLE_MESSAGE = "Mașina nu este disponibilă în perioada selectată"
+
+def day_slots(car_id: str, booking_id: str, start: int, end: int) -> List[dict]:
+    slots = []
+    for ordinal in range(start, end + 1):
+        day = date.fromordinal(ordinal)
+        slots.append({
+            "car_id": car_id,
+            "day": day.isoformat(),
+            "booking_id": booking_id,
+            # Past slots can no longer conflict; the TTL index removes them
+            "expires_at": datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(days=2)
+        })
+    return slots
+
+async def reserve_slots(car_id: str, booking_id: str, start: int, end: int):
+    """Claim every day of a rental for a booking, 409 if any of them is taken"""
+    # Requests for days already known to be booked fail without touching the database
+    if not availability.is_free(car_id, start, end):
+        raise HTTPException(status_code=409, detail=UNAVAILABLE_MESSAGE)
+    try:
+        await db.car_slots.insert_many(day_slots(car_id, booking_id, start, end), ordered=True)
+    except BulkWriteError as e:
+        # Give back the days claimed before the conflicting one
+        await release_slots(booking_id)
+        if all(error["code"] == DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+            raise HTTPException(status_code=409, detail=UNAVAILABLE_MESSAGE)
+        raise
+
+async def release_slots(booking_id: str):
+    await db.car_slots.delete_many({"booking_id": booking_id})
+
+async def ensure_booking_slots():
+    """Create the slot indexes and claim slots for active bookings made before slots existed"""
+    await db.car_slots.create_index([("car_id", 1), ("day", 1)], unique=True)
+    await db.car_slots.create_index("booking_id")
+    await db.car_slots.create_index("expires_at", expireAfterSeconds=0)
+    
+    reserved = set(await db.car_slots.distinct("booking_id"))
+    today = datetime.now(timezone.utc).date().toordinal()
+    backfilled = 0
+    for booking_id, (car_id, start, end) in availability.bookings.items():
+        if booking_id in reserved or end < today:
+            continue
+        try:
+            await db.car_slots.insert_many(day_slots(car_id, booking_id, max(start, today), end), ordered=False)
+        except BulkWriteError:
+            logger.warning(f"Booking {booking_id} overlaps another booking of {car_id}")
+        backfilled += 1
+    if backfilled:
+        logger.info(f"Reserved day slots for {backfilled} existing bookings")
+
+# ==================== PRICING ====================
+
+class QuoteTerms(NamedTuple):
+    """Parts of a quote that depend only on the dates, times, location and insurance"""
+    days: int
+    billable_days: float  # days weighted by seasonal multipliers
+    tier: str
+    with_casco: bool
+    location_fee: float
+    outside_hours_fee: float
+
+def season_day_index(day: date) -> int:
+    """Position of a calendar day in a leap year (0-365), so Feb 29 has its own slot"""
+    return date(2000, day.month, day.day).timetuple().tm_yday - 1
+
+LEAP_DAY_INDEX = 59
+
+class CompiledPricing:
+    """Pricing rules compiled into lookup tables
+    
+    Tier selection is a bisect over the tier thresholds, hour fees are read from a
+    24-entry array and seasonal multipliers are summed with prefix sums, so a quote
+    costs the same however many rules there are.
+    """
+
+    def __init__(self, rules: PricingRules):
+        tiers = sorted(rules.tiers, key=lambda tier: tier.min_days)
+        if not tiers or tiers[0].min_days != 1:
+            raise ValueError("The first pricing tier must start at 1 day")
+        for tier in tiers:
+            if tier.rate_field not in CarPricing.model_fields:
+                raise ValueError(f"Unknown rate field: {tier.rate_field}")
+        self.tier_min_days = [tier.min_days for tier in tiers]
+        self.tier_fields = [tier.rate_field for tier in tiers]
+        
+        self.location_fees = dict(rules.location_fees)
+        
+        if not 0 <= rules.business_hours_start <= rules.business_hours_end <= 24:
+            raise ValueError("Invalid business hours")
+        self.hour_fees = [
+            0 if rules.business_hours_start <= hour < rules.business_hours_end else rules.outside_hours_fee
+            for hour in range(24)
+        ]
+        
+        multipliers = [1.0] * 366
+        for season in rules.seasons:
+            try:
+                first = season_day_index(datetime.strptime(f"2000-{season.start}", "%Y-%m-%d").date())
+                last = season_day_index(datetime.strptime(f"2000-{season.end}", "%Y-%m-%d").date())
+            except ValueError:
+                raise ValueError(f"Invalid season dates: {season.start} - {season.end}")
+            # Seasons may wrap around the new year (e.g. 12-20 to 01-10)
+            indexes = range(first, last + 1) if first <= last else [*range(first, 366), *range(0, last + 1)]
+            for index in indexes:
+                multipliers[index] = season.multiplier
+        self.has_seasons = bool(rules.seasons)
+        self.multipliers = multipliers
+        self.multiplier_prefix = [0.0]
+        for multiplier in multipliers:
+            self.multiplier_prefix.append(self.multiplier_prefix[-1] + multiplier)
+        
+        self.version = hashlib.sha1(rules.model_dump_json(exclude={"updated_at"}).encode()).hexdigest()[:12]
+
+    def tier(self, days: int) -> str:
+        return self.tier_fields[bisect.bisect_right(self.tier_min_days, days) - 1]
+
+    def billable_days(self, start: date, days: int):
+        """Sum of the seasonal multipliers over the rental days"""
+        if not self.has_seasons:
+            return days
+        total = 0.0
+        day = start
+        remaining = days
+        # One prefix-sum lookup per calendar year the rental touches
+        while remaining > 0:
+            year_end = date(day.year, 12, 31)
+            span = min(remaining, (year_end - day).days + 1)
+            last = day + timedelta(days=span - 1)
+            first_index, last_index = season_day_index(day), season_day_index(last)
+            total += self.multiplier_prefix[last_index + 1] - self.multiplier_prefix[first_index]
+            if not calendar.isleap(day.year) and first_index < LEAP_DAY_INDEX < last_index:
+                total -= self.multipliers[LEAP_DAY_INDEX]
+            day = last + timedelta(days=1)
+            remaining -= span
+        return round(total, 4)
+
+async def load_pricing_rules():
+    """Load the pricing rules from the database (defaults when none were saved)"""
+    global pricing_engine
+    doc = await db.settings.find_one({"_id": "pricing_rules"}, {"_id": 0})
+    rules = PricingRules(**doc) if doc else PricingRules()
+    pricing_engine = CompiledPricing(rules)
+    return rules
+
+pricing_engine = CompiledPricing(PricingRules())
+
+def quote_terms(request) -> QuoteTerms:
+    """Compute the car-independent part of a quote"""
+    # Calculate days
+    try:
+        start = datetime.fromisoformat(request.start_date)
+        end = datetime.fromisoformat(request.end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    try:
+        start_hour = int(request.start_time.split(":")[0])
+        end_hour = int(request.end_time.split(":")[0])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time")
+    if not (0 <= start_hour <= 23 and 0 <= end_hour <= 23):
+        raise HTTPException(status_code=400, detail="Invalid time")
+    days = (end - start).days + 1
+    
+    if days < 1:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    if days > MAX_RENTAL_DAYS:
+        raise HTTPException(status_code=400, detail=RENTAL_TOO_LONG_MESSAGE)
+    
+    return QuoteTerms(
+        days=days,
+        billable_days=pricing_engine.billable_days(start.date(), days),
+        tier=pricing_engine.tier(days),
+        with_casco=request.insurance == "casco",
+        location_fee=pricing_engine.location_fees.get(request.location, 0),
+        outside_hours_fee=pricing_engine.hour_fees[start_hour] + pricing_engine.hour_fees[end_hour]
+    )
+
+def price_quote(car_id: str, pricing: dict, casco_daily: float, terms: QuoteTerms) -> PriceCalculationResponse:
+    """Apply a car's rates to the shared quote terms"""
+    daily_rate = pricing[terms.tier]
+    base_price = daily_rate * terms.billable_days
+    
+    # CASCO insurance
+    casco_price = casco_daily * terms.days if terms.with_casco else 0
+    
+    total_price = base_price + casco_price + terms.location_fee + terms.outside_hours_fee
+    
+    return PriceCalculationResponse(
+        car_id=car_id,
+        days=terms.days,
+        base_price=base_price,
+        casco_price=casco_price,
+        location_fee=terms.location_fee,
+        outside_hours_fee=terms.outside_hours_fee,
+        total_price=total_price,
+        breakdown={
+            "daily_rate": daily_rate,
+            "days": terms.days,
+            "billable_days": terms.billable_days,
+            "base": base_price,
+            "casco": casco_price,
+            "location": terms.location_fee,
+            "outside_hours": terms.outside_hours_fee
+        }
+    )
+
+class PricingTable:
+    """Rates of every car, loaded in one query and reloaded after catalog changes"""
+
+    def __init__(self):
+        self.rows: dict = {}  # car_id -> {car_id, pricing, casco_price, available}
+        self.version = None
+
+    async def ensure_current(self):
+        version = catalog_cache.version
+        if self.version == version:
+            return
+        cars = await db.cars.find(
+            {},
+            {"_id": 0, "car_id": 1, "pricing": 1, "casco_price": 1, "available": 1}
+        ).sort(list(CAR_SORT_SPEC.items())).to_list(None)
+        self.rows = {car["car_id"]: car for car in cars}
+        self.version = version
+
+pricing_table = PricingTable()
+
+QUOTE_CACHE_SIZE = int(os.environ.get('QUOTE_CACHE_SIZE', '4096'))
+QUOTE_CACHE_TTL = int(os.environ.get('QUOTE_CACHE_TTL', '600'))  # seconds
+
+class QuoteCache(LRUCache):
+    """LRU cache of single-car quotes with a TTL, cleared per car when its rates change
+    
+    Keys are (car_id, rules version, quote terms). The terms already reduce the dates,
+    hours and location to days, tier and fees, so quotes that only differ in ways that
+    do not affect the price share an entry.
+    """
+
+    def __init__(self, max_entries: int, ttl: int):
+        super().__init__(max_entries, ttl)
+        self.car_generations: dict = {}  # car_id -> bumped on every rate change
+
+    def key(self, car_id: str, terms: QuoteTerms):
+        return (car_id, pricing_engine.version, terms)
+
+    def invalidate_car(self, car_id: str):
+        self.car_generations[car_id] = self.car_generations.get(car_id, 0) + 1
+        self.invalidate(lambda key, quote: key[0] == car_id)
+
+quote_cache = QuoteCache(QUOTE_CACHE_SIZE, QUOTE_CACHE_TTL)
+
+# Tokens are per process: like the car generations in their version, the key is
+# in memory only, so a token from before a restart or from another worker is recomputed
+QUOTE_TOKEN_SECRET = secrets.token_bytes(32)
+QUOTE_TOKEN_TTL = int(os.environ.get('QUOTE_TOKEN_TTL', '1800'))  # seconds
+QUOTE_TOKEN_FIELDS = ["car_id", "start_date", "end_date", "start_time", "end_time", "location", "insurance"]
+# Car fields cached quotes and quote tokens carry; changing any of them invalidates both
+QUOTED_CAR_FIELDS = {"pricing", "casco_price", "name", "images", "main_image_index"}
+
+def main_car_image(car: dict) -> str:
+    """The car's main image, falling back to the first one"""
+    main_image_index = car.get("main_image_index", 0)
+    if car.get("images") and len(car["images"]) > main_image_index:
+        return car["images"][main_image_index]
+    elif car.get("images") and len(car["images"]) > 0:
+        return car["images"][0]
+    return ""
+
+def quote_pricing_version(car_id: str) -> str:
+    """Changes whenever the price of a quote for this car could change"""
+    return f"{pricing_engine.version}-{quote_cache.car_generations.get(car_id, 0)}"
+
+def sign_quote(request, quote: PriceCalculationResponse, car_name: str, car_image: str) -> str:
+    """HMAC-signed token of a quote, so a booking can reuse it without recomputing"""
+    payload = {field: getattr(request, field) for field in QUOTE_TOKEN_FIELDS}
+    payload.update({
+        "total_price": quote.total_price,
+        "car_name": car_name,
+        "car_image": car_image,
+        "version": quote_pricing_version(request.car_id),
+        "exp": int(datetime.now(timezone.utc).timestamp()) + QUOTE_TOKEN_TTL
+    })
+    body = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).rstrip(b"=")
+    signature = base64.urlsafe_b64encode(hmac.new(QUOTE_TOKEN_SECRET, body, hashlib.sha256).digest()).rstrip(b"=")
+    return f"{body.decode()}.{signature.decode()}"
+
+def verify_quote(token: str, request) -> Optional[dict]:
+    """Payload of a quote token that still applies to this request, None otherwise
+    
+    Tokens that do not verify (e.g. issued before a restart or by another worker), expired
+    tokens, tokens for other dates or options and tokens from before a price change are
+    all None, so the caller recomputes the price instead of trusting them.
+    """
+    try:
+        body, signature = token.encode().split(b".")
+        expected = base64.urlsafe_b64encode(hmac.new(QUOTE_TOKEN_SECRET, body, hashlib.sha256).digest()).rstrip(b"=")
+        if not hmac.compare_digest(signature, expected):
+            return None
+        payload = json.loads(base64.urlsafe_b64decode(body + b"=" * (-len(body) % 4)))
+    except (ValueError, binascii.Error):
+        return None
+    
+    if payload["exp"] < datetime.now(timezone.utc).timestamp():
+        return None
+    if any(payload[field] != getattr(request, field) for field in QUOTE_TOKEN_FIELDS):
+        return None
+    if payload["version"] != quote_pricing_version(request.car_id):
+        return None
+    return payload
+
+# ==================== CAR LOADER ====================
+
+# Every field a handler reads from a car looked up by ID
+CAR_LOADER_PROJECTION = {
+    "_id": 0,
+    "car_id": 1,
+    "name": 1,
+    "images": 1,
+    "main_image_index": 1,
+    "pricing": 1,
+    "casco_price": 1,
+    "available": 1
+}
+
+class CarLoader:
+    """Request-scoped car lookups by ID
+    
+    Lookups started in the same event loop tick are sent as one $in query, and a car
+    is only fetched once per request however many times it is asked for.
+    """
+
+    def __init__(self):
+        self.futures: dict = {}  # car_id -> Future of the car document (None if missing)
+        self.pending: dict = {}  # car_id -> Future, not yet queried
+        self.dispatch_task = None
+        self.queries = 0
+
+    async def load(self, car_id: str) -> Optional[dict]:
+        future = self.futures.get(car_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.futures[car_id] = future
+            self.pending[car_id] = future
+            if self.dispatch_task is None:
+                # Let the other lookups of this tick queue up first
+                self.dispatch_task = asyncio.get_running_loop().create_task(self._dispatch())
+        return await future
+
+    async def load_many(self, car_ids) -> dict:
+        """car_id -> car document for the cars that exist"""
+        car_ids = list(dict.fromkeys(car_ids))
+        cars = await asyncio.gather(*(self.load(car_id) for car_id in car_ids))
+        return {car_id: car for car_id, car in zip(car_ids, cars) if car is not None}
+
+    async def _dispatch(self):
+        await asyncio.sleep(0)
+        batch, self.pending, self.dispatch_task = self.pending, {}, None
+        self.queries += 1
+        try:
+            cars = await db.cars.find({"car_id": {"$in": list(batch)}}, CAR_LOADER_PROJECTION).to_list(None)
+        except Exception as e:
+            for car_id, future in batch.items():
+                del self.futures[car_id]
+                future.set_exception(e)
+            return
+        by_id = {car["car_id"]: car for car in cars}
+        for car_id, future in batch.items():
+            future.set_result(by_id.get(car_id))
+
+def car_loader(request: Request) -> CarLoader:
+    """The car loader of the current request"""
+    loader = getattr(request.state, "car_loader", None)
+    if loader is None:
+        loader = request.state.car_loader = CarLoader()
+    return loader
+
+# ==================== CAR ENDPOINTS ====================
+
+# Fields the app offers filter chips for
+CAR_FACET_FIELDS = ["brand", "transmission", "fuel", "body_type", "seats"]
+
+# Full car documents without internal fields
+CAR_PUBLIC_PROJECTION = {"_id": 0, "brand_key": 0}
+
+# Fields the list screens need; the rest of the document comes from GET /cars/{car_id}
+CAR_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "car_id": 1,
+    "name": 1,
+    "brand": 1,
+    "model": 1,
+    "year": 1,
+    "body_type": 1,
+    "transmission": 1,
+    "fuel": 1,
+    "seats": 1,
+    "pricing.day_1": 1,
+    "order": 1,
+    "available": 1,
+    # Only the main image, falling back to the first one like the clients do
+    "main_image": {"$ifNull": [
+        {"$arrayElemAt": ["$images", {"$ifNull": ["$main_image_index", 0]}]},
+        {"$arrayElemAt": ["$images", 0]}
+    ]}
+}
+
+def build_car_query(
+    brand: Optional[str],
+    transmission: Optional[str],
+    fuel: Optional[str],
+    body_type: Optional[str],
+    min_seats: Optional[int],
+    available_only: bool
+) -> dict:
+    """Mongo filter for the catalog filters shared by the list and facet endpoints"""
     query = {}
     
     if brand:
-        query["brand"] = {"$regex": brand, "$options": "i"}
+        # Anchored prefix match on the normalized key can use the brand_key index
+        query["brand_key"] = {"$regex": f"^{re.escape(search_key(brand))}"}
     if transmission:
         query["transmission"] = transmission
     if fuel:
@@ -858,90 +2803,249 @@ async def get_cars(
     if available_only:
         query["available"] = True
     
-    # Sort by order field (ascending), then by name for items without order
-    cars = await db.cars.find(query, {"_id": 0}).to_list(100)
-    # Sort: items with order first (by order), then items without order (by name)
-    cars.sort(key=lambda x: (x.get('order') is None, x.get('order', 999), x.get('name', '')))
-    return cars
+    return query
+
+@api_router.get("/cars")
+async def get_cars(
+    brand: Optional[str] = None,
+    transmission: Optional[str] = None,
+    fuel: Optional[str] = None,
+    body_type: Optional[str] = None,
+    min_seats: Optional[int] = None,
+    available_only: bool = True,
+    view: str = "summary",
+    limit: Optional[int] = Query(None, ge=1, le=CARS_PAGE_MAX),
+    after: Optional[str] = None,
+    available_from: Optional[str] = None,
+    available_to: Optional[str] = None
+):
+    """Get all cars with optional filters (view=summary for list screens, view=full for whole documents)
+    
+    Pass limit to page through the fleet; the cursor for the next page is returned
+    in the X-Next-Cursor header and is sent back as after. available_from/available_to
+    keep only cars with no booking in that inclusive date range.
+    """
+    if view not in ["summary", "full"]:
+        raise HTTPException(status_code=400, detail="Invalid view")
+    
+    date_range = availability_filter_range(available_from, available_to)
+    
+    cache_key = (
+        "cars", brand, transmission, fuel, body_type, min_seats, available_only, view, limit, after,
+        date_range, availability.version if date_range else None
+    )
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        body, next_cursor = cached
+        return cars_page_response(body, next_cursor)
+    cache_version = catalog_cache.version
+    
+    query = build_car_query(brand, transmission, fuel, body_type, min_seats, available_only)
+    if after:
+        query["$or"] = cursor_filter(decode_car_cursor(after))
+    if date_range:
+        query["car_id"] = {"$nin": availability.busy_cars(*date_range)}
+    
+    # Sorted by display order, then name, in Mongo using the catalog indexes
+    fetch_limit = limit + 1 if limit else None
+    if view == "summary":
+        pipeline = [{"$match": query}, {"$sort": CAR_SORT_SPEC}]
+        if fetch_limit:
+            pipeline.append({"$limit": fetch_limit})
+        pipeline.append({"$project": CAR_SUMMARY_PROJECTION})
+        cars = await db.cars.aggregate(pipeline).to_list(None)
+        for car in cars:
+            main_image = car.pop("main_image", None)
+            car["images"] = [image_variant_url(main_image, "medium")] if main_image else []
+            car["main_image_index"] = 0
+    else:
+        cursor = db.cars.find(query, CAR_PUBLIC_PROJECTION).sort(list(CAR_SORT_SPEC.items()))
+        if fetch_limit:
+            cursor = cursor.limit(fetch_limit)
+        cars = await cursor.to_list(None)
+    
+    next_cursor = None
+    if limit and len(cars) > limit:
+        cars = cars[:limit]
+        next_cursor = encode_car_cursor(cars[-1])
+    
+    body = render_json(cars)
+    catalog_cache.set(cache_key, (body, next_cursor), cache_version)
+    return cars_page_response(body, next_cursor)
+
+@api_router.get("/cars/facets")
+async def get_car_facets(
+    brand: Optional[str] = None,
+    transmission: Optional[str] = None,
+    fuel: Optional[str] = None,
+    body_type: Optional[str] = None,
+    min_seats: Optional[int] = None,
+    available_only: bool = True,
+    available_from: Optional[str] = None,
+    available_to: Optional[str] = None
+):
+    """Count the matching cars per filter option (brand, transmission, fuel, body type, seats)"""
+    date_range = availability_filter_range(available_from, available_to)
+    cache_key = (
+        "facets", brand, transmission, fuel, body_type, min_seats, available_only,
+        date_range, availability.version if date_range else None
+    )
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return json_bytes_response(cached)
+    cache_version = catalog_cache.version
+    
+    query = build_car_query(brand, transmission, fuel, body_type, min_seats, available_only)
+    if date_range:
+        query["car_id"] = {"$nin": availability.busy_cars(*date_range)}
+    facet_stages = {
+        field: [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+        for field in CAR_FACET_FIELDS
+    }
+    facet_stages["total"] = [{"$count": "count"}]
+    
+    results = await db.cars.aggregate([
+        {"$match": query},
+        {"$facet": facet_stages}
+    ]).to_list(1)
+    result = results[0] if results else {}
+    
+    total = result.get("total") or [{"count": 0}]
+    facets = {
+        "total": total[0]["count"],
+        "facets": {
+            field: [
+                {"value": bucket["_id"], "count": bucket["count"]}
+                for bucket in result.get(field, [])
+                if bucket["_id"] is not None
+            ]
+            for field in CAR_FACET_FIELDS
+        }
+    }
+    
+    body = render_json(facets)
+    catalog_cache.set(cache_key, body, cache_version)
+    return json_bytes_response(body)
+
+@api_router.get("/cars/suggest")
+async def suggest_cars(q: str = "", limit: int = Query(8, ge=1, le=SUGGEST_MAX_RESULTS)):
+    """Autocomplete brands, models and car names for the search box"""
+    if not q.strip():
+        return []
+    await catalog_search.ensure_current()
+    return catalog_search.suggest(q, limit)
 
 @api_router.get("/cars/{car_id}")
 async def get_car(car_id: str):
     """Get car by ID"""
-    car = await db.cars.find_one({"car_id": car_id}, {"_id": 0})
+    car = await db.cars.find_one({"car_id": car_id}, CAR_PUBLIC_PROJECTION)
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
     return car
 
+@api_router.get("/cars/{car_id}/calendar")
+async def get_car_calendar(car_id: str, month: Optional[str] = None):
+    """Get the booked days of a car in one month (YYYY-MM, defaults to the current month)"""
+    if month is None:
+        month = datetime.now(timezone.utc).strftime("%Y-%m")
+    if not MONTH_RE.match(month):
+        raise HTTPException(status_code=400, detail="Invalid month")
+    year, month_number = int(month[:4]), int(month[5:])
+    days_in_month = calendar.monthrange(year, month_number)[1]
+    
+    bitmap = availability.month_bitmap(car_id, month)
+    
+    # Runs of booked days, e.g. [[10, 12], [20, 20]]
+    booked_ranges = []
+    day = 1
+    while day <= days_in_month:
+        if bitmap >> (day - 1) & 1:
+            first = day
+            while day < days_in_month and bitmap >> day & 1:
+                day += 1
+            booked_ranges.append([first, day])
+        day += 1
+    
+    return {
+        "car_id": car_id,
+        "month": month,
+        "days_in_month": days_in_month,
+        "bitmap": bitmap,
+        "booked_ranges": booked_ranges
+    }
+
 @api_router.post("/calculate-price")
-async def calculate_price(request: PriceCalculationRequest):
+async def calculate_price(request: PriceCalculationRequest, http_request: Request):
     """Calculate rental price"""
-    # Get car
-    car = await db.cars.find_one({"car_id": request.car_id}, {"_id": 0})
-    if not car:
-        raise HTTPException(status_code=404, detail="Car not found")
-    
-    # Calculate days
-    start = datetime.fromisoformat(request.start_date)
-    end = datetime.fromisoformat(request.end_date)
-    days = (end - start).days + 1
-    
-    if days < 1:
-        raise HTTPException(status_code=400, detail="Invalid date range")
-    
-    # Get base price based on day tier
-    pricing = car["pricing"]
-    if days >= 20:
-        daily_rate = pricing["day_20"]
-    elif days >= 10:
-        daily_rate = pricing["day_10"]
-    elif days >= 5:
-        daily_rate = pricing["day_5"]
-    elif days >= 3:
-        daily_rate = pricing["day_3"]
+    terms = quote_terms(request)
+    cache_key = quote_cache.key(request.car_id, terms)
+    cached = quote_cache.get(cache_key)
+    if cached is None:
+        generation = quote_cache.generation
+        # Get car
+        car = await car_loader(http_request).load(request.car_id)
+        if not car:
+            raise HTTPException(status_code=404, detail="Car not found")
+        
+        quote = price_quote(request.car_id, car["pricing"], car["casco_price"], terms)
+        cached = (quote, car["name"], main_car_image(car))
+        quote_cache.set(cache_key, cached, generation)
+    
+    quote, car_name, car_image = cached
+    return quote.model_copy(update={"quote_token": sign_quote(request, quote, car_name, car_image)})
+
+@api_router.post("/calculate-price/batch")
+async def calculate_price_batch(request: PriceBatchRequest):
+    """Calculate rental prices of many cars (all available cars by default) for the same dates"""
+    # Everything except the per-car rates is shared, so it is computed once
+    terms = quote_terms(request)
+    await pricing_table.ensure_current()
+    
+    if request.car_ids is None:
+        rows = [row for row in pricing_table.rows.values() if row.get("available", True)]
+        not_found = []
     else:
-        daily_rate = pricing["day_1"]
-    
-    base_price = daily_rate * days
+        rows = [pricing_table.rows[car_id] for car_id in request.car_ids if car_id in pricing_table.rows]
+        not_found = [car_id for car_id in request.car_ids if car_id not in pricing_table.rows]
     
-    # CASCO insurance
-    casco_price = 0
-    if request.insurance == "casco":
-        casco_price = car["casco_price"] * days
-    
-    # Location fee
-    location_fee = 0
-    if request.location == "iasi_airport":
-        location_fee = 150
+    return {
+        "days": terms.days,
+        "quotes": [price_quote(row["car_id"], row["pricing"], row["casco_price"], terms) for row in rows],
+        "not_found": not_found
+    }
+
+@api_router.get("/admin/pricing-rules")
+async def get_pricing_rules(request: Request):
+    """Get the pricing rules (admin only)"""
+    await require_admin(request)
+    doc = await db.settings.find_one({"_id": "pricing_rules"}, {"_id": 0})
+    rules = PricingRules(**doc) if doc else PricingRules()
+    return {**rules.model_dump(), "version": pricing_engine.version}
+
+@api_router.put("/admin/pricing-rules")
+async def update_pricing_rules(rules: PricingRules, request: Request):
+    """Replace the pricing rules (admin only); quotes use them immediately"""
+    await require_admin(request)
     
-    # Outside hours fee (before 09:00 or after 18:00)
-    outside_hours_fee = 0
-    start_hour = int(request.start_time.split(":")[0])
-    end_hour = int(request.end_time.split(":")[0])
+    rules.updated_at = datetime.now(timezone.utc)
+    try:
+        compiled = CompiledPricing(rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if start_hour < 9 or start_hour >= 18:
-        outside_hours_fee += 25
-    if end_hour < 9 or end_hour >= 18:
-        outside_hours_fee += 25
+    await db.settings.update_one(
+        {"_id": "pricing_rules"},
+        {"$set": rules.model_dump()},
+        upsert=True
+    )
     
-    total_price = base_price + casco_price + location_fee + outside_hours_fee
+    global pricing_engine
+    pricing_engine = compiled
     
-    return PriceCalculationResponse(
-        car_id=request.car_id,
-        days=days,
-        base_price=base_price,
-        casco_price=casco_price,
-        location_fee=location_fee,
-        outside_hours_fee=outside_hours_fee,
-        total_price=total_price,
-        breakdown={
-            "daily_rate": daily_rate,
-            "days": days,
-            "base": base_price,
-            "casco": casco_price,
-            "location": location_fee,
-            "outside_hours": outside_hours_fee
-        }
-    )
+    return {**rules.model_dump(), "version": compiled.version}
 
 # ==================== BOOKING ENDPOINTS ====================
 
@@ -950,36 +3054,23 @@ async def create_booking(booking_data: BookingCreate, request: Request):
     """Create a new booking"""
     user = await require_auth(request)
     
-    # Get car
-    car = await db.cars.find_one({"car_id": booking_data.car_id}, {"_id": 0})
-    if not car:
-        raise HTTPException(status_code=404, detail="Car not found")
-    
-    # Calculate price
-    price_request = PriceCalculationRequest(
-        car_id=booking_data.car_id,
-        start_date=booking_data.start_date,
-        end_date=booking_data.end_date,
-        start_time=booking_data.start_time,
-        end_time=booking_data.end_time,
-        location=booking_data.location,
-        insurance=booking_data.insurance
-    )
-    price_result = await calculate_price(price_request)
-    
-    # Get main car image
-    main_image_index = car.get("main_image_index", 0)
-    car_image = ""
-    if car.get("images") and len(car["images"]) > main_image_index:
-        car_image = car["images"][main_image_index]
-    elif car.get("images") and len(car["images"]) > 0:
-        car_image = car["images"][0]
+    # A valid quote token already carries the price and car details the user saw
+    quote = verify_quote(booking_data.quote_token, booking_data) if booking_data.quote_token else None
+    if quote is None:
+        price_request = PriceCalculationRequest(
+            **{field: getattr(booking_data, field) for field in QUOTE_TOKEN_FIELDS}
+        )
+        price_result = await calculate_price(price_request, request)
+        quote = verify_quote(price_result.quote_token, booking_data)
+    start_day, end_day = parse_date_range(booking_data.start_date, booking_data.end_date)
+    if end_day - start_day + 1 > MAX_RENTAL_DAYS:
+        raise HTTPException(status_code=400, detail=RENTAL_TOO_LONG_MESSAGE)
     
     booking = Booking(
         user_id=user.user_id,
         car_id=booking_data.car_id,
-        car_name=car["name"],
-        car_image=car_image,
+        car_name=quote["car_name"],
+        car_image=quote["car_image"],
         start_date=booking_data.start_date,
         end_date=booking_data.end_date,
         start_time=booking_data.start_time,
@@ -989,10 +3080,18 @@ async def create_booking(booking_data: BookingCreate, request: Request):
         customer_name=booking_data.customer_name,
         customer_phone=booking_data.customer_phone,
         customer_age=booking_data.customer_age,
-        total_price=price_result.total_price
+        total_price=quote["total_price"]
     )
     
-    await db.bookings.insert_one(booking.model_dump())
+    await reserve_slots(booking.car_id, booking.booking_id, start_day, end_day)
+    try:
+        await db.bookings.insert_one(booking.model_dump())
+    except Exception:
+        await release_slots(booking.booking_id)
+        raise
+    availability.add(booking.model_dump())
+    await count_status_change("bookings", None, booking.status)
+    admin_stats.invalidate()
     
     return booking.model_dump()
 
@@ -1015,8 +3114,11 @@ async def create_car(car_data: CarCreate, request: Request):
     """Create a new car (admin only)"""
     await require_admin(request)
     
+    car_data.images = await store_inline_images(car_data.images)
     car = Car(**car_data.model_dump())
-    await db.cars.insert_one(car.model_dump())
+    await db.cars.insert_one({**car.model_dump(), "brand_key": search_key(car.brand)})
+    catalog_changed()
+    schedule_image_variants(car.images)
     
     return car.model_dump()
 
@@ -1029,6 +3131,11 @@ async def update_car(car_id: str, car_data: CarUpdate, request: Request):
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
     
+    if "images" in update_data:
+        update_data["images"] = await store_inline_images(update_data["images"])
+    if "brand" in update_data:
+        update_data["brand_key"] = search_key(update_data["brand"])
+    
     result = await db.cars.update_one(
         {"car_id": car_id},
         {"$set": update_data}
@@ -1037,7 +3144,14 @@ async def update_car(car_id: str, car_data: CarUpdate, request: Request):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Car not found")
     
-    car = await db.cars.find_one({"car_id": car_id}, {"_id": 0})
+    # After the write, so a quote read before it cannot be cached past it
+    if QUOTED_CAR_FIELDS & update_data.keys():
+        quote_cache.invalidate_car(car_id)
+    catalog_changed()
+    if "images" in update_data:
+        schedule_image_variants(update_data["images"])
+    
+    car = await db.cars.find_one({"car_id": car_id}, CAR_PUBLIC_PROJECTION)
     return car
 
 @api_router.delete("/admin/cars/{car_id}")
@@ -1049,6 +3163,8 @@ async def delete_car(car_id: str, request: Request):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Car not found")
     
+    quote_cache.invalidate_car(car_id)
+    catalog_changed()
     return {"message": "Car deleted successfully"}
 
 @api_router.get("/admin/bookings")
@@ -1063,16 +3179,15 @@ async def get_all_bookings(request: Request, status: Optional[str] = None):
     bookings = await db.bookings.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
     
     # Enrich bookings with car images if missing
+    cars = await car_loader(request).load_many(
+        booking["car_id"] for booking in bookings
+        if not booking.get("car_image") and booking.get("car_id")
+    )
     enriched_bookings = []
     for booking in bookings:
-        if not booking.get("car_image") and booking.get("car_id"):
-            car = await db.cars.find_one({"car_id": booking["car_id"]}, {"images": 1, "main_image_index": 1})
-            if car and car.get("images"):
-                main_idx = car.get("main_image_index", 0)
-                if len(car["images"]) > main_idx:
-                    booking["car_image"] = car["images"][main_idx]
-                elif len(car["images"]) > 0:
-                    booking["car_image"] = car["images"][0]
+        car = cars.get(booking.get("car_id"))
+        if not booking.get("car_image") and car:
+            booking["car_image"] = main_car_image(car)
         enriched_bookings.append(booking)
     
     return enriched_bookings
@@ -1085,17 +3200,39 @@ async def update_booking_status(booking_id: str, request: Request):
     body = await request.json()
     new_status = body.get("status")
     
-    if new_status not in ["pending", "confirmed", "completed", "cancelled"]:
+    if new_status not in BOOKING_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    result = await db.bookings.update_one(
+    booking = await db.bookings.find_one(
         {"booking_id": booking_id},
-        {"$set": {"status": new_status}}
+        {"_id": 0, "booking_id": 1, "car_id": 1, "start_date": 1, "end_date": 1, "status": 1}
     )
-    
-    if result.matched_count == 0:
+    if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     
+    was_cancelled = booking.get("status") == "cancelled"
+    if was_cancelled and new_status != "cancelled":
+        # Reactivating a booking has to win its days back
+        start_day, end_day = parse_date_range(booking["start_date"], booking["end_date"])
+        await reserve_slots(booking["car_id"], booking_id, start_day, end_day)
+    
+    # The status it had right before this write, in case another admin changed it meanwhile
+    previous = await db.bookings.find_one_and_update(
+        {"booking_id": booking_id},
+        {"$set": {"status": new_status}},
+        projection={"_id": 0, "status": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous:
+        await count_status_change("bookings", previous.get("status"), new_status)
+    
+    if new_status == "cancelled":
+        await release_slots(booking_id)
+        availability.remove(booking_id)
+    elif was_cancelled:
+        availability.add(booking)
+    admin_stats.invalidate()
+    
     return {"message": "Status updated successfully"}
 
 @api_router.delete("/admin/bookings/{booking_id}")
@@ -1103,14 +3240,19 @@ async def delete_booking(booking_id: str, request: Request):
     """Delete a booking (admin only)"""
     await require_admin(request)
     
-    result = await db.bookings.delete_one({"booking_id": booking_id})
-    if result.deleted_count == 0:
+    deleted = await db.bookings.find_one_and_delete({"booking_id": booking_id}, projection={"_id": 0, "status": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Booking not found")
     
+    await count_status_change("bookings", deleted.get("status"), None)
+    await release_slots(booking_id)
+    availability.remove(booking_id)
+    admin_stats.invalidate()
+    
     return {"message": "Booking deleted successfully"}
 
 @api_router.post("/admin/make-admin")
-async def make_admin(request: Request):
+async def make_admin(request: Request, response: Response):
     """Make current user admin (for testing)"""
     user = await require_auth(request)
     
@@ -1118,7 +3260,21 @@ async def make_admin(request: Request):
         {"user_id": user.user_id},
         {"$set": {"role": "admin"}}
     )
-    
+    session_cache.invalidate_user(user.user_id)
+    
+    if SESSION_TOKEN_MODE == "jwt":
+        # Signed tokens carry the role, so the old one still says "user"
+        session_token = issue_session_token({**user.model_dump(), "role": "admin"})
+        response.set_cookie(
+            key="session_token",
+            value=session_token,
+            httponly=True,
+            secure=True,
+            samesite="none",
+            max_age=7 * 24 * 60 * 60,
+            path="/"
+        )
+        return {"message": "User is now admin", "session_token": session_token}
     return {"message": "User is now admin"}
 
 # ==================== PARTNER REQUEST ENDPOINTS ====================
@@ -1128,6 +3284,8 @@ async def create_partner_request(data: PartnerRequestCreate):
     """Submit a partner request (public endpoint)"""
     partner_request = PartnerRequest(**data.model_dump())
     await db.partner_requests.insert_one(partner_request.model_dump())
+    await count_status_change("partner_requests", None, partner_request.status)
+    admin_stats.invalidate()
     return {"message": "Cererea a fost trimisă cu succes!", "request_id": partner_request.request_id}
 
 @api_router.get("/admin/partner-requests")
@@ -1150,48 +3308,23 @@ async def update_partner_request_status(request_id: str, request: Request):
     body = await request.json()
     new_status = body.get("status")
     
-    if new_status not in ["pending", "contacted", "approved", "rejected"]:
+    if new_status not in PARTNER_REQUEST_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    result = await db.partner_requests.update_one(
+    previous = await db.partner_requests.find_one_and_update(
         {"request_id": request_id},
-        {"$set": {"status": new_status}}
+        {"$set": {"status": new_status}},
+        projection={"_id": 0, "status": 1},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if not previous:
         raise HTTPException(status_code=404, detail="Request not found")
     
+    await count_status_change("partner_requests", previous.get("status"), new_status)
+    admin_stats.invalidate()
     return {"message": "Status updated successfully"}
 
-@api_router.get("/admin/stats")
-async def get_admin_stats(request: Request):
-    """Get admin dashboard statistics"""
-    await require_admin(request)
-    
-    total_cars = await db.cars.count_documents({})
-    available_cars = await db.cars.count_documents({"available": True})
-    total_bookings = await db.bookings.count_documents({})
-    pending_bookings = await db.bookings.count_documents({"status": "pending"})
-    confirmed_bookings = await db.bookings.count_documents({"status": "confirmed"})
-    total_partner_requests = await db.partner_requests.count_documents({})
-    pending_partner_requests = await db.partner_requests.count_documents({"status": "pending"})
-    
-    return {
-        "cars": {
-            "total": total_cars,
-            "available": available_cars
-        },
-        "bookings": {
-            "total": total_bookings,
-            "pending": pending_bookings,
-            "confirmed": confirmed_bookings
-        },
-        "partner_requests": {
-            "total": total_partner_requests,
-            "pending": pending_partner_requests
-        }
-    }
-
 # ==================== BANNER ENDPOINTS ====================
 
 @api_router.get("/banners")
@@ -1205,8 +3338,11 @@ async def get_banners(active_only: bool = False):
 async def create_banner(data: BannerCreate, request: Request):
     """Create a new banner (admin only)"""
     await require_admin(request)
+    data.image = await store_inline_image(data.image)
     banner = Banner(**data.model_dump())
     await db.banners.insert_one(banner.model_dump())
+    content_versions.bump("banners")
+    schedule_image_variants([banner.image])
     return banner.model_dump()
 
 @api_router.put("/admin/banners/{banner_id}")
@@ -1216,9 +3352,14 @@ async def update_banner(banner_id: str, data: BannerUpdate, request: Request):
     update_data = {k: v for k, v in data.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
+    if "image" in update_data:
+        update_data["image"] = await store_inline_image(update_data["image"])
     result = await db.banners.update_one({"banner_id": banner_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Banner not found")
+    content_versions.bump("banners")
+    if "image" in update_data:
+        schedule_image_variants([update_data["image"]])
     banner = await db.banners.find_one({"banner_id": banner_id}, {"_id": 0})
     return banner
 
@@ -1229,6 +3370,7 @@ async def delete_banner(banner_id: str, request: Request):
     result = await db.banners.delete_one({"banner_id": banner_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Banner not found")
+    content_versions.bump("banners")
     return {"message": "Banner deleted successfully"}
 
 # ==================== SEED DATA ====================
@@ -1441,7 +3583,11 @@ async def seed_data():
         }
     ]
     
+    for car in sample_cars:
+        car.setdefault("order", CAR_ORDER_LAST)
+        car["brand_key"] = search_key(car["brand"])
     await db.cars.insert_many(sample_cars)
+    catalog_changed()
     return {"message": f"Seeded {len(sample_cars)} cars"}
 
 # Serve admin panel - MUST be before include_router
@@ -1453,14 +3599,62 @@ async def admin_panel():
 # Include the router
 app.include_router(api_router)
 
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """Answer revalidation of unchanged public content with 304 Not Modified"""
+    kinds = content_kinds_for(request.url.path, request.url.query) if request.method in ("GET", "HEAD") else None
+    if not kinds:
+        return await call_next(request)
+    
+    etag = content_versions.etag(kinds, f"{request.url.path}?{request.url.query}")
+    last_modified = content_versions.last_modified(kinds)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "no-cache"
+    }
+    
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif not_modified_since(request.headers.get("If-Modified-Since"), last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.on_event("startup")
+async def startup_tasks():
+    start_image_workers()
+    start_auth_http_client()
+    await bcrypt_calibration.calibrate()
+    await db.image_variants.create_index("image", unique=True)
+    await ensure_catalog_indexes()
+    await ensure_user_indexes()
+    await ensure_session_indexes()
+    await ensure_revocation_list()
+    await load_pricing_rules()
+    await availability.load()
+    await ensure_booking_slots()
+    await ensure_counters()
+    await migrate_inline_images()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    stop_image_workers()
+    password_hasher.shutdown()
+    await stop_auth_http_client()
     client.close()
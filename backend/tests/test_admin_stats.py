@@ -0,0 +1,128 @@
+"""
+Backend tests for the admin dashboard statistics
+Tests: admin-only access, cached stats, counters following booking changes
+"""
+import pytest
+import requests
+import os
+import random
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://swipe-gesture-qa.preview.emergentagent.com')
+
+ADMIN_PHONE = "060123456"
+ADMIN_PASSWORD = "test123"
+
+# Far enough ahead that no real booking overlaps, random so reruns do not collide
+MONTH = f"{random.randint(2040, 2099)}-{random.randint(1, 12):02d}"
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Get authentication headers"""
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"phone": ADMIN_PHONE, "password": ADMIN_PASSWORD}
+    )
+    if response.status_code == 200:
+        token = response.json()["session_token"]
+        return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    pytest.skip("Authentication failed")
+
+
+def get_stats(auth_headers) -> dict:
+    response = requests.get(f"{BASE_URL}/api/admin/stats", headers=auth_headers)
+    assert response.status_code == 200, f"Failed to get stats: {response.text}"
+    return response.json()
+
+
+class TestAdminStats:
+    """Test the consolidated dashboard statistics"""
+
+    def test_stats_require_admin(self):
+        """Test that the dashboard statistics are not public"""
+        response = requests.get(f"{BASE_URL}/api/admin/stats")
+        assert response.status_code in [401, 403]
+
+    def test_stats_shape(self, auth_headers):
+        """Test that the stats include every dashboard figure"""
+        stats = get_stats(auth_headers)
+        for key in [
+            "total_cars", "available_cars", "total_bookings", "total_users", "pending_bookings",
+            "pending_partners", "total_partner_requests", "booking_stats", "recent_bookings"
+        ]:
+            assert key in stats, f"Missing {key}"
+        assert set(stats["booking_stats"]) == {"pending", "confirmed", "completed", "cancelled"}
+        assert len(stats["recent_bookings"]) <= 5
+        print(f"✓ Stats: {stats['total_cars']} cars, {stats['total_bookings']} bookings")
+
+    def test_stats_cached(self, auth_headers):
+        """Test that repeated reads are served from the stats cache"""
+        get_stats(auth_headers)
+        before = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers).json()["admin_stats"]
+        get_stats(auth_headers)
+        after = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers).json()["admin_stats"]
+        assert after["hits"] == before["hits"] + 1
+        print(f"✓ Stats cache hit ratio {after['hit_ratio']}")
+
+
+class TestBookingCounters:
+    """Test that the dashboard counters follow booking changes"""
+
+    @pytest.fixture(scope="class")
+    def car_id(self):
+        """ID of an available car"""
+        cars = requests.get(f"{BASE_URL}/api/cars").json()
+        if not cars:
+            pytest.skip("No cars in catalog")
+        return cars[0]["car_id"]
+
+    def test_counts_follow_create_cancel_delete(self, auth_headers, car_id):
+        """Test that creating, cancelling and deleting a booking moves the counts"""
+        before = get_stats(auth_headers)
+
+        response = requests.post(
+            f"{BASE_URL}/api/bookings",
+            json={
+                "car_id": car_id,
+                "start_date": f"{MONTH}-03",
+                "end_date": f"{MONTH}-05",
+                "start_time": "10:00",
+                "end_time": "10:00",
+                "location": "iasi_city",
+                "insurance": "rca",
+                "customer_name": "TEST_Counters",
+                "customer_phone": "060000000",
+                "customer_age": 30
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Failed to create booking: {response.text}"
+        booking_id = response.json()["booking_id"]
+
+        try:
+            created = get_stats(auth_headers)
+            assert created["total_bookings"] == before["total_bookings"] + 1
+            assert created["pending_bookings"] == before["pending_bookings"] + 1
+            assert booking_id in [booking["booking_id"] for booking in created["recent_bookings"]]
+
+            response = requests.put(
+                f"{BASE_URL}/api/admin/bookings/{booking_id}/status",
+                json={"status": "cancelled"},
+                headers=auth_headers
+            )
+            assert response.status_code == 200
+            cancelled = get_stats(auth_headers)
+            assert cancelled["total_bookings"] == before["total_bookings"] + 1
+            assert cancelled["pending_bookings"] == before["pending_bookings"]
+            assert cancelled["booking_stats"]["cancelled"] == before["booking_stats"]["cancelled"] + 1
+        finally:
+            requests.delete(f"{BASE_URL}/api/admin/bookings/{booking_id}", headers=auth_headers)
+
+        deleted = get_stats(auth_headers)
+        assert deleted["total_bookings"] == before["total_bookings"]
+        assert deleted["booking_stats"] == before["booking_stats"]
+        print("✓ Counters followed create, cancel and delete")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,250 @@
+"""
+Backend tests for authentication
+Tests: cached sessions after logout and profile changes, revoking every session of a user,
+concurrent password hashing, expired sessions, duplicate registrations,
+rehashing passwords stored with another bcrypt cost
+"""
+import pytest
+import requests
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from passlib.hash import bcrypt
+from pymongo import MongoClient
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://swipe-gesture-qa.preview.emergentagent.com')
+
+ADMIN_PHONE = "060123456"
+ADMIN_PASSWORD = "test123"
+TEST_PASSWORD = "test123"
+CONCURRENT_LOGINS = 8
+
+
+def new_account():
+    """Phone, email and password for a user that does not exist yet"""
+    suffix = uuid.uuid4().hex[:8]
+    return {
+        "phone": f"07{int(suffix, 16) % 10 ** 7:07d}",
+        "email": f"test_{suffix}@example.com",
+        "password": TEST_PASSWORD,
+        "name": "TEST_Auth"
+    }
+
+
+def register(account: dict) -> dict:
+    """Register an account and return bearer headers for it"""
+    response = requests.post(f"{BASE_URL}/api/auth/register", json=account)
+    assert response.status_code == 200, f"Registration failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['session_token']}"}
+
+
+def login(account: dict) -> dict:
+    response = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"phone": account["phone"], "password": account["password"]}
+    )
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return {"Authorization": f"Bearer {response.json()['session_token']}"}
+
+
+@pytest.fixture(scope="module")
+def db():
+    """Direct database access for state the API cannot create (needs MONGO_URL)"""
+    mongo_url = os.environ.get('MONGO_URL')
+    if not mongo_url:
+        pytest.skip("MONGO_URL not set")
+    client = MongoClient(mongo_url, serverSelectionTimeoutMS=2000)
+    yield client[os.environ.get('DB_NAME', 'car_rental_db')]
+    client.close()
+
+
+@pytest.fixture
+def account():
+    """A registered test user, deleted afterwards"""
+    account = new_account()
+    account["headers"] = register(account)
+    yield account
+    requests.delete(f"{BASE_URL}/api/auth/delete-account", headers=login(account))
+
+
+class TestSessionCache:
+    """Test that cached sessions never outlive logout or profile changes"""
+
+    def test_logout_invalidates_session(self, account):
+        """Test that a cached session token is rejected right after logout"""
+        headers = account["headers"]
+        for _ in range(2):
+            assert requests.get(f"{BASE_URL}/api/auth/me", headers=headers).status_code == 200
+
+        response = requests.post(f"{BASE_URL}/api/auth/logout", headers=headers)
+        assert response.status_code == 200
+
+        response = requests.get(f"{BASE_URL}/api/auth/me", headers=headers)
+        assert response.status_code == 401, "Session still valid after logout"
+        print("✓ Logged out session rejected")
+
+    def test_name_change_visible(self, account):
+        """Test that a profile change shows up on the next request despite the cache"""
+        headers = account["headers"]
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=headers).json()["name"] == "TEST_Auth"
+
+        response = requests.put(f"{BASE_URL}/api/users/name", json={"name": "TEST_Renamed"}, headers=headers)
+        assert response.status_code == 200
+
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=headers).json()["name"] == "TEST_Renamed"
+        print("✓ Name change visible immediately")
+
+
+class TestSessionRevocation:
+    """Test revoking sessions, opaque or signed"""
+
+    def test_delete_account_revokes_every_session(self):
+        """Test that deleting an account rejects all of its session tokens"""
+        account = new_account()
+        first = register(account)
+        second = login(account)
+
+        response = requests.delete(f"{BASE_URL}/api/auth/delete-account", headers=first)
+        assert response.status_code == 200
+
+        for headers in [first, second]:
+            response = requests.get(f"{BASE_URL}/api/auth/me", headers=headers)
+            assert response.status_code == 401, "Session still valid after account deletion"
+        print("✓ All sessions revoked with the account")
+
+    def test_repeated_logout(self, account):
+        """Test that logging out an already revoked token is not an error"""
+        for _ in range(2):
+            response = requests.post(f"{BASE_URL}/api/auth/logout", headers=account["headers"])
+            assert response.status_code == 200
+        print("✓ Repeated logout accepted")
+
+
+class TestRegistration:
+    """Test that a phone number or email can only be registered once"""
+
+    def test_duplicate_phone(self, account):
+        """Test that registering an existing phone number is rejected"""
+        duplicate = {**new_account(), "phone": account["phone"]}
+        response = requests.post(f"{BASE_URL}/api/auth/register", json=duplicate)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Numărul de telefon este deja înregistrat"
+        print("✓ Duplicate phone rejected")
+
+    def test_duplicate_email(self, account):
+        """Test that registering an existing email is rejected"""
+        duplicate = {**new_account(), "email": account["email"]}
+        response = requests.post(f"{BASE_URL}/api/auth/register", json=duplicate)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Email-ul este deja înregistrat"
+        print("✓ Duplicate email rejected")
+
+    def test_concurrent_duplicates(self):
+        """Test that only one of several concurrent sign-ups with the same phone succeeds"""
+        account = new_account()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(
+                lambda _: requests.post(f"{BASE_URL}/api/auth/register", json=account),
+                range(4)
+            ))
+        created = [response for response in responses if response.status_code == 200]
+        try:
+            assert len(created) == 1, f"Statuses: {[response.status_code for response in responses]}"
+            assert all(response.status_code == 400 for response in responses if response not in created)
+            print("✓ 1 of 4 concurrent sign-ups succeeded")
+        finally:
+            for response in created:
+                requests.delete(
+                    f"{BASE_URL}/api/auth/delete-account",
+                    headers={"Authorization": f"Bearer {response.json()['session_token']}"}
+                )
+
+
+class TestPasswordHashing:
+    """Test that password hashing runs in a bounded worker pool"""
+
+    @pytest.fixture(scope="class")
+    def admin_headers(self):
+        """Get authentication headers"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"phone": ADMIN_PHONE, "password": ADMIN_PASSWORD}
+        )
+        if response.status_code == 200:
+            token = response.json()["session_token"]
+            return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        pytest.skip("Authentication failed")
+
+    def test_concurrent_logins(self, account, admin_headers):
+        """Test that concurrent logins either succeed or are shed with a 503 and Retry-After"""
+        def hasher_completed():
+            metrics = requests.get(f"{BASE_URL}/api/admin/metrics", headers=admin_headers).json()
+            return metrics["password_hasher"]["completed"]
+
+        completed_before = hasher_completed()
+        with ThreadPoolExecutor(max_workers=CONCURRENT_LOGINS) as executor:
+            responses = list(executor.map(
+                lambda _: requests.post(
+                    f"{BASE_URL}/api/auth/login",
+                    json={"phone": account["phone"], "password": TEST_PASSWORD}
+                ),
+                range(CONCURRENT_LOGINS)
+            ))
+
+        succeeded = [response for response in responses if response.status_code == 200]
+        for response in responses:
+            assert response.status_code in [200, 503], f"Unexpected status: {response.status_code}"
+            if response.status_code == 503:
+                assert "Retry-After" in response.headers
+        assert succeeded, "No login succeeded"
+        assert hasher_completed() - completed_before >= len(succeeded)
+        print(f"✓ {len(succeeded)} of {CONCURRENT_LOGINS} concurrent logins hashed in the worker pool")
+
+
+class TestPasswordRehash:
+    """Test that passwords hashed with another bcrypt cost are upgraded on login"""
+
+    def test_rehash_on_login(self, account, db):
+        """Test that a login with a cost-4 hash succeeds and stores a hash at the current cost"""
+        db.users.update_one(
+            {"phone": account["phone"]},
+            {"$set": {"password": bcrypt.using(rounds=4).hash(TEST_PASSWORD)}}
+        )
+
+        login(account)
+
+        stored = db.users.find_one({"phone": account["phone"]}, {"password": 1})["password"]
+        rounds = int(stored.split("$")[2])
+        assert rounds != 4, "Password was not rehashed"
+        assert bcrypt.verify(TEST_PASSWORD, stored)
+        login(account)
+        print(f"✓ Password rehashed from cost 4 to cost {rounds}")
+
+
+class TestSessionExpiry:
+    """Test that expired sessions are rejected"""
+
+    def test_expired_session_rejected(self, account, db):
+        """Test that a session past its expiry is not accepted, even before the reaper removes it"""
+        user_id = requests.get(f"{BASE_URL}/api/auth/me", headers=account["headers"]).json()["user_id"]
+        session_token = f"sess_{uuid.uuid4().hex}"
+        db.user_sessions.insert_one({
+            "user_id": user_id,
+            "session_token": session_token,
+            "expires_at": datetime.now(timezone.utc) - timedelta(minutes=1),
+            "created_at": datetime.now(timezone.utc) - timedelta(days=7)
+        })
+        try:
+            response = requests.get(
+                f"{BASE_URL}/api/auth/me",
+                headers={"Authorization": f"Bearer {session_token}"}
+            )
+            assert response.status_code == 401, "Expired session accepted"
+            print("✓ Expired session rejected")
+        finally:
+            db.user_sessions.delete_many({"session_token": session_token})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
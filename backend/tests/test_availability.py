@@ -0,0 +1,135 @@
+"""
+Backend tests for booking availability
+Tests: concurrent bookings of the same dates, available_from/available_to filter, car calendar
+"""
+import pytest
+import requests
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://swipe-gesture-qa.preview.emergentagent.com')
+
+ADMIN_PHONE = "060123456"
+ADMIN_PASSWORD = "test123"
+
+CONCURRENT_BOOKINGS = 8
+
+# Far enough ahead that no real booking overlaps, random so reruns do not collide
+YEAR = random.randint(2040, 2099)
+MONTH = f"{YEAR}-{random.randint(1, 12):02d}"
+BOOKING_TERMS = {
+    "start_date": f"{MONTH}-10",
+    "end_date": f"{MONTH}-12",
+    "start_time": "10:00",
+    "end_time": "10:00",
+    "location": "iasi_city",
+    "insurance": "rca",
+    "customer_name": "Test Availability",
+    "customer_phone": "060000000",
+    "customer_age": 30
+}
+
+
+class TestAvailability:
+    """Test that a car's dates can only be booked once"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Get authentication headers"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"phone": ADMIN_PHONE, "password": ADMIN_PASSWORD}
+        )
+        if response.status_code == 200:
+            token = response.json()["session_token"]
+            return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        pytest.skip("Authentication failed")
+
+    @pytest.fixture(scope="class")
+    def car_id(self):
+        """ID of an available car"""
+        cars = requests.get(f"{BASE_URL}/api/cars").json()
+        if not cars:
+            pytest.skip("No cars in catalog")
+        return cars[0]["car_id"]
+
+    @pytest.fixture(scope="class")
+    def responses(self, auth_headers, car_id):
+        """Book the same dates concurrently, then delete whatever got created"""
+        def book(_):
+            return requests.post(
+                f"{BASE_URL}/api/bookings",
+                json={**BOOKING_TERMS, "car_id": car_id},
+                headers=auth_headers
+            )
+
+        with ThreadPoolExecutor(max_workers=CONCURRENT_BOOKINGS) as executor:
+            responses = list(executor.map(book, range(CONCURRENT_BOOKINGS)))
+        yield responses
+
+        for response in responses:
+            if response.status_code == 200:
+                requests.delete(
+                    f"{BASE_URL}/api/admin/bookings/{response.json()['booking_id']}",
+                    headers=auth_headers
+                )
+
+    def test_concurrent_bookings(self, responses):
+        """Test that exactly one of several concurrent bookings of the same dates succeeds"""
+        statuses = sorted(response.status_code for response in responses)
+        assert statuses == [200] + [409] * (CONCURRENT_BOOKINGS - 1), f"Unexpected statuses: {statuses}"
+        print(f"✓ 1 of {CONCURRENT_BOOKINGS} concurrent bookings succeeded")
+
+    def test_booked_car_filtered_out(self, responses, car_id):
+        """Test that a booked car is missing from the cars available on its dates"""
+        assert any(response.status_code == 200 for response in responses), "No booking was created"
+        response = requests.get(
+            f"{BASE_URL}/api/cars",
+            params={"available_from": f"{MONTH}-11", "available_to": f"{MONTH}-15"}
+        )
+        assert response.status_code == 200
+        assert car_id not in [car["car_id"] for car in response.json()]
+
+        response = requests.get(
+            f"{BASE_URL}/api/cars",
+            params={"available_from": f"{MONTH}-13", "available_to": f"{MONTH}-15"}
+        )
+        assert response.status_code == 200
+        assert car_id in [car["car_id"] for car in response.json()]
+        print(f"✓ {car_id} unavailable on {MONTH}-11..15, available on {MONTH}-13..15")
+
+    def test_facets_honour_date_filter(self, responses):
+        """Test that the facet counts match the date-filtered car list"""
+        assert any(response.status_code == 200 for response in responses), "No booking was created"
+        params = {"available_from": f"{MONTH}-11", "available_to": f"{MONTH}-15"}
+        cars = requests.get(f"{BASE_URL}/api/cars", params=params).json()
+        response = requests.get(f"{BASE_URL}/api/cars/facets", params=params)
+        assert response.status_code == 200
+        assert response.json()["total"] == len(cars)
+        print(f"✓ Facets count {len(cars)} cars available on {MONTH}-11..15")
+
+    def test_calendar_shows_booking(self, responses, car_id):
+        """Test that the car calendar shows the booked days"""
+        assert any(response.status_code == 200 for response in responses), "No booking was created"
+        response = requests.get(f"{BASE_URL}/api/cars/{car_id}/calendar", params={"month": MONTH})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["booked_ranges"] == [[10, 12]]
+        assert data["bitmap"] == 0b111 << 9
+        print(f"✓ Calendar for {MONTH}: {data['booked_ranges']}")
+
+    def test_rental_too_long(self, auth_headers, car_id):
+        """Test that a rental longer than the maximum is rejected before anything is reserved"""
+        response = requests.post(
+            f"{BASE_URL}/api/bookings",
+            json={**BOOKING_TERMS, "car_id": car_id, "end_date": f"{YEAR + 100}-01-12"},
+            headers=auth_headers,
+            timeout=10
+        )
+        assert response.status_code == 400
+        print(f"✓ Century-long rental rejected: {response.json()['detail']}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,191 @@
+"""
+Backend tests for the public car catalog
+Tests: summary/full views, cache invalidation, cursor pagination, facets, autocomplete, conditional GET
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://swipe-gesture-qa.preview.emergentagent.com')
+
+ADMIN_PHONE = "060123456"
+ADMIN_PASSWORD = "test123"
+
+
+class TestCatalogViews:
+    """Test summary and full catalog views"""
+
+    def test_summary_view_is_default(self):
+        """Test that the list endpoint returns summary documents by default"""
+        response = requests.get(f"{BASE_URL}/api/cars")
+        assert response.status_code == 200, f"Failed to get cars: {response.text}"
+
+        cars = response.json()
+        assert isinstance(cars, list), "Expected list of cars"
+        for car in cars:
+            assert "description" not in car, "Summary should not include description"
+            assert "specs" not in car, "Summary should not include specs"
+            assert "day_1" in car["pricing"], "Summary should include pricing.day_1"
+            assert len(car["images"]) <= 1, "Summary should include only the main image"
+            assert car["main_image_index"] == 0
+        print(f"✓ Summary view returned {len(cars)} cars")
+
+    def test_full_view(self):
+        """Test that view=full returns whole documents"""
+        response = requests.get(f"{BASE_URL}/api/cars?view=full")
+        assert response.status_code == 200
+        for car in response.json():
+            assert "casco_price" in car
+            assert "brand_key" not in car, "Internal fields should not be exposed"
+        print("✓ Full view returns complete documents")
+
+    def test_invalid_view(self):
+        """Test that an unknown view is rejected"""
+        response = requests.get(f"{BASE_URL}/api/cars?view=everything")
+        assert response.status_code == 400
+
+
+class TestCatalogCache:
+    """Test that admin car changes show up in the cached catalog right away"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Get authentication headers"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"phone": ADMIN_PHONE, "password": ADMIN_PASSWORD}
+        )
+        if response.status_code == 200:
+            token = response.json()["session_token"]
+            return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        pytest.skip("Authentication failed")
+
+    def catalog_names(self) -> dict:
+        return {car["car_id"]: car["name"] for car in requests.get(f"{BASE_URL}/api/cars").json()}
+
+    def test_car_changes_invalidate_catalog(self, auth_headers):
+        """Test that creating, renaming and deleting a car are visible on the next catalog read"""
+        self.catalog_names()  # warm the cache
+        response = requests.post(
+            f"{BASE_URL}/api/admin/cars",
+            json={
+                "name": "TEST_Catalog Cache",
+                "brand": "TestBrand",
+                "model": "CacheTest",
+                "year": 2024,
+                "transmission": "manual",
+                "fuel": "petrol",
+                "seats": 5,
+                "images": [],
+                "pricing": {"day_1": 40, "day_3": 35, "day_5": 30, "day_10": 25, "day_20": 20},
+                "casco_price": 8
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Failed to create car: {response.text}"
+        car_id = response.json()["car_id"]
+
+        try:
+            assert self.catalog_names().get(car_id) == "TEST_Catalog Cache"
+
+            response = requests.put(
+                f"{BASE_URL}/api/admin/cars/{car_id}",
+                json={"name": "TEST_Catalog Renamed"},
+                headers=auth_headers
+            )
+            assert response.status_code == 200
+            assert self.catalog_names().get(car_id) == "TEST_Catalog Renamed"
+        finally:
+            requests.delete(f"{BASE_URL}/api/admin/cars/{car_id}", headers=auth_headers)
+
+        assert car_id not in self.catalog_names()
+        print("✓ Catalog reflects create, update and delete immediately")
+
+
+class TestCatalogPagination:
+    """Test keyset pagination of the catalog"""
+
+    def test_pages_match_full_list(self):
+        """Test that walking every page returns the same cars in the same order"""
+        full_list = [car["car_id"] for car in requests.get(f"{BASE_URL}/api/cars").json()]
+
+        paged = []
+        params = {"limit": 2}
+        while True:
+            response = requests.get(f"{BASE_URL}/api/cars", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) <= 2
+            paged.extend(car["car_id"] for car in page)
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if not next_cursor:
+                break
+            params = {"limit": 2, "after": next_cursor}
+
+        assert paged == full_list, "Paged results differ from the full list"
+        print(f"✓ Paged through {len(paged)} cars")
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = requests.get(f"{BASE_URL}/api/cars?limit=2&after=not-a-cursor")
+        assert response.status_code == 400
+
+
+class TestCatalogSearch:
+    """Test facets and autocomplete"""
+
+    def test_facet_counts_match_list(self):
+        """Test that facet totals agree with the filtered list"""
+        response = requests.get(f"{BASE_URL}/api/cars/facets")
+        assert response.status_code == 200, f"Failed to get facets: {response.text}"
+
+        data = response.json()
+        assert data["total"] == len(requests.get(f"{BASE_URL}/api/cars").json())
+        for field in ["brand", "transmission", "fuel", "body_type", "seats"]:
+            assert field in data["facets"], f"Missing facet: {field}"
+
+        for bucket in data["facets"]["fuel"]:
+            cars = requests.get(f"{BASE_URL}/api/cars", params={"fuel": bucket["value"]}).json()
+            assert len(cars) == bucket["count"], f"Count mismatch for fuel={bucket['value']}"
+        print(f"✓ Facets match the list for {data['total']} cars")
+
+    def test_suggest_brand_prefix(self):
+        """Test that autocomplete is case-insensitive and prefix based"""
+        cars = requests.get(f"{BASE_URL}/api/cars").json()
+        if not cars:
+            pytest.skip("No cars in catalog")
+
+        brand = cars[0]["brand"]
+        response = requests.get(f"{BASE_URL}/api/cars/suggest", params={"q": brand[:2].lower()})
+        assert response.status_code == 200
+        suggestions = response.json()
+        assert any(s["text"] == brand and s["kind"] == "brand" for s in suggestions), \
+            f"Brand {brand} not suggested: {suggestions}"
+        print(f"✓ Suggestions for '{brand[:2].lower()}': {[s['text'] for s in suggestions]}")
+
+    def test_suggest_empty_query(self):
+        """Test that an empty query returns no suggestions"""
+        response = requests.get(f"{BASE_URL}/api/cars/suggest", params={"q": ""})
+        assert response.status_code == 200
+        assert response.json() == []
+
+
+class TestConditionalGet:
+    """Test ETag revalidation of public content"""
+
+    @pytest.mark.parametrize("path", ["/api/cars", "/api/faqs", "/api/banners", "/api/legal/terms", "/api/contacts"])
+    def test_etag_revalidation(self, path):
+        """Test that a matching If-None-Match returns 304"""
+        response = requests.get(f"{BASE_URL}{path}")
+        assert response.status_code == 200
+        etag = response.headers.get("ETag")
+        assert etag, f"Missing ETag on {path}"
+        assert response.headers.get("Last-Modified"), f"Missing Last-Modified on {path}"
+
+        revalidated = requests.get(f"{BASE_URL}{path}", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304, f"Expected 304 on {path}, got {revalidated.status_code}"
+        print(f"✓ {path} revalidates with ETag {etag}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -258,8 +258,8 @@ class TestCarWithCustomFeatures:
         requests.delete(f"{BASE_URL}/api/admin/cars/{car_id}", headers=auth_headers)
 
     def test_get_all_cars_includes_custom_features(self):
-        """Test that car list endpoint returns custom_features"""
-        response = requests.get(f"{BASE_URL}/api/cars")
+        """Test that full car list endpoint returns custom_features"""
+        response = requests.get(f"{BASE_URL}/api/cars?view=full")
         assert response.status_code == 200, f"Failed to get cars: {response.text}"
         
         cars = response.json()
@@ -0,0 +1,108 @@
+"""
+Backend tests for the content-addressed image store
+Tests: base64 uploads are stored as references, GET /api/images/{hash} caching headers
+"""
+import base64
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://swipe-gesture-qa.preview.emergentagent.com')
+
+ADMIN_PHONE = "060123456"
+ADMIN_PASSWORD = "test123"
+
+# Smallest valid PNG (1x1 transparent pixel)
+PIXEL_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+
+class TestImageStore:
+    """Test that car images are stored once and served by hash"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Get authentication headers"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"phone": ADMIN_PHONE, "password": ADMIN_PASSWORD}
+        )
+        if response.status_code == 200:
+            token = response.json()["session_token"]
+            return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        pytest.skip("Authentication failed")
+
+    def test_car_images_stored_as_references(self, auth_headers):
+        """Test that a base64 upload is replaced by an /api/images/ reference"""
+        data_url = "data:image/png;base64," + base64.b64encode(PIXEL_PNG).decode()
+        car_data = {
+            "name": "TEST_Image Store",
+            "brand": "TestBrand",
+            "model": "ImageTest",
+            "year": 2024,
+            "transmission": "manual",
+            "fuel": "petrol",
+            "seats": 5,
+            "images": [data_url, "https://images.unsplash.com/photo-1579317471790-0e30bd51b55e?w=800"],
+            "pricing": {"day_1": 40, "day_3": 35, "day_5": 30, "day_10": 25, "day_20": 20},
+            "casco_price": 8
+        }
+
+        response = requests.post(f"{BASE_URL}/api/admin/cars", json=car_data, headers=auth_headers)
+        assert response.status_code == 200, f"Failed to create car: {response.text}"
+        car = response.json()
+
+        try:
+            assert "/api/images/" in car["images"][0], f"Image not stored as reference: {car['images'][0][:60]}"
+            assert car["images"][1] == car_data["images"][1], "External URLs should be kept as-is"
+
+            image_url = car["images"][0]
+            if image_url.startswith("/"):
+                image_url = f"{BASE_URL}{image_url}"
+            image_response = requests.get(image_url)
+            assert image_response.status_code == 200
+            assert image_response.content == PIXEL_PNG, "Stored bytes differ from upload"
+            assert image_response.headers["Content-Type"] == "image/png"
+            assert "immutable" in image_response.headers["Cache-Control"]
+
+            etag = image_response.headers["ETag"]
+            cached_response = requests.get(image_url, headers={"If-None-Match": etag})
+            assert cached_response.status_code == 304, "Expected 304 for matching ETag"
+            print(f"✓ Image stored by hash and served with ETag {etag}")
+        finally:
+            requests.delete(f"{BASE_URL}/api/admin/cars/{car['car_id']}", headers=auth_headers)
+
+    def test_unsupported_image_rejected(self, auth_headers):
+        """Test that an upload in a format the store does not accept is rejected, not kept inline"""
+        svg = base64.b64encode(b'<svg xmlns="http://www.w3.org/2000/svg"/>').decode()
+        response = requests.post(
+            f"{BASE_URL}/api/admin/cars",
+            json={
+                "name": "TEST_Image Unsupported",
+                "brand": "TestBrand",
+                "model": "ImageTest",
+                "year": 2024,
+                "transmission": "manual",
+                "fuel": "petrol",
+                "seats": 5,
+                "images": [f"data:image/svg+xml;base64,{svg}"],
+                "pricing": {"day_1": 40, "day_3": 35, "day_5": 30, "day_10": 25, "day_20": 20},
+                "casco_price": 8
+            },
+            headers=auth_headers
+        )
+        if response.status_code == 200:
+            requests.delete(f"{BASE_URL}/api/admin/cars/{response.json()['car_id']}", headers=auth_headers)
+        assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+        print("✓ SVG upload rejected")
+
+    def test_unknown_image_returns_404(self):
+        """Test that an unknown hash is a 404"""
+        response = requests.get(f"{BASE_URL}/api/images/{'0' * 64}")
+        assert response.status_code == 404
+        print("✓ Unknown image hash returns 404")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
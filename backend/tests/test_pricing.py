@@ -0,0 +1,164 @@
+"""
+Backend tests for price quoting
+Tests: single quote breakdown, batch quotes agree with single quotes, pricing rules
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://swipe-gesture-qa.preview.emergentagent.com')
+
+ADMIN_PHONE = "060123456"
+ADMIN_PASSWORD = "test123"
+
+QUOTE_TERMS = {
+    "start_date": "2030-07-01",
+    "end_date": "2030-07-05",
+    "start_time": "08:00",
+    "end_time": "19:00",
+    "location": "iasi_airport",
+    "insurance": "casco"
+}
+
+
+class TestPriceQuotes:
+    """Test single and batch price calculation"""
+
+    @pytest.fixture(scope="class")
+    def car_ids(self):
+        """IDs of the available cars"""
+        cars = requests.get(f"{BASE_URL}/api/cars").json()
+        if not cars:
+            pytest.skip("No cars in catalog")
+        return [car["car_id"] for car in cars]
+
+    def test_single_quote_breakdown(self, car_ids):
+        """Test that a single quote adds up"""
+        response = requests.post(f"{BASE_URL}/api/calculate-price", json={**QUOTE_TERMS, "car_id": car_ids[0]})
+        assert response.status_code == 200, f"Quote failed: {response.text}"
+
+        quote = response.json()
+        assert quote["days"] == 5
+        assert quote["location_fee"] == 150, "Iasi airport fee expected"
+        assert quote["outside_hours_fee"] == 50, "Both ends are outside working hours"
+        assert quote["total_price"] == quote["base_price"] + quote["casco_price"] + 150 + 50
+        print(f"✓ Quote for {car_ids[0]}: {quote['total_price']}")
+
+    def test_quote_token(self, car_ids):
+        """Test that single quotes carry a signed token and batch quotes do not"""
+        quote = requests.post(f"{BASE_URL}/api/calculate-price", json={**QUOTE_TERMS, "car_id": car_ids[0]}).json()
+        assert quote["quote_token"], "Single quotes should carry a quote token"
+        assert quote["quote_token"].count(".") == 1, "Token should be payload.signature"
+
+        batch = requests.post(f"{BASE_URL}/api/calculate-price/batch", json=QUOTE_TERMS).json()
+        assert all(q["quote_token"] is None for q in batch["quotes"])
+
+    def test_batch_matches_single_quotes(self, car_ids):
+        """Test that batch quotes are identical to single quotes"""
+        response = requests.post(f"{BASE_URL}/api/calculate-price/batch", json=QUOTE_TERMS)
+        assert response.status_code == 200, f"Batch quote failed: {response.text}"
+
+        batch = response.json()
+        assert batch["days"] == 5
+        assert {quote["car_id"] for quote in batch["quotes"]} == set(car_ids)
+
+        for quote in batch["quotes"][:3]:
+            single = requests.post(
+                f"{BASE_URL}/api/calculate-price",
+                json={**QUOTE_TERMS, "car_id": quote["car_id"]}
+            ).json()
+            assert quote["total_price"] == single["total_price"], f"Mismatch for {quote['car_id']}"
+        print(f"✓ Batch returned {len(batch['quotes'])} quotes")
+
+    def test_batch_unknown_car(self, car_ids):
+        """Test that unknown car IDs are reported instead of failing the batch"""
+        response = requests.post(
+            f"{BASE_URL}/api/calculate-price/batch",
+            json={**QUOTE_TERMS, "car_ids": [car_ids[0], "car_does_not_exist"]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [quote["car_id"] for quote in data["quotes"]] == [car_ids[0]]
+        assert data["not_found"] == ["car_does_not_exist"]
+
+    def test_invalid_date_range(self):
+        """Test that an end date before the start date is rejected"""
+        response = requests.post(
+            f"{BASE_URL}/api/calculate-price/batch",
+            json={**QUOTE_TERMS, "end_date": "2030-06-01"}
+        )
+        assert response.status_code == 400
+
+    def test_rental_too_long(self, car_ids):
+        """Test that quotes for rentals longer than the maximum are rejected"""
+        response = requests.post(
+            f"{BASE_URL}/api/calculate-price",
+            json={**QUOTE_TERMS, "car_id": car_ids[0], "end_date": "2130-07-05"}
+        )
+        assert response.status_code == 400
+
+    def test_invalid_hours(self, car_ids):
+        """Test that pickup and return hours outside 0-23 are rejected"""
+        for start_time in ["-1:00", "24:00"]:
+            response = requests.post(
+                f"{BASE_URL}/api/calculate-price",
+                json={**QUOTE_TERMS, "car_id": car_ids[0], "start_time": start_time}
+            )
+            assert response.status_code == 400, f"{start_time} accepted: {response.text}"
+            assert response.json()["detail"] == "Invalid time"
+
+
+class TestPricingRules:
+    """Test the admin pricing rules endpoints"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Get authentication headers"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"phone": ADMIN_PHONE, "password": ADMIN_PASSWORD}
+        )
+        if response.status_code == 200:
+            token = response.json()["session_token"]
+            return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        pytest.skip("Authentication failed")
+
+    def test_rules_require_admin(self):
+        """Test that the pricing rules are not public"""
+        response = requests.get(f"{BASE_URL}/api/admin/pricing-rules")
+        assert response.status_code in [401, 403]
+
+    def test_get_rules(self, auth_headers):
+        """Test that the rules include the tier table and a version"""
+        response = requests.get(f"{BASE_URL}/api/admin/pricing-rules", headers=auth_headers)
+        assert response.status_code == 200, f"Failed to get rules: {response.text}"
+        rules = response.json()
+        assert rules["tiers"][0]["min_days"] == 1
+        assert rules["version"]
+        print(f"✓ Pricing rules version {rules['version']}")
+
+    def test_invalid_rules_rejected(self, auth_headers):
+        """Test that rules with an unknown rate field are rejected"""
+        rules = requests.get(f"{BASE_URL}/api/admin/pricing-rules", headers=auth_headers).json()
+        rules.pop("version")
+        rules["tiers"] = [{"min_days": 1, "rate_field": "day_7"}]
+        response = requests.put(f"{BASE_URL}/api/admin/pricing-rules", json=rules, headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_invalid_fees_and_multipliers_rejected(self, auth_headers):
+        """Test that non-numeric or negative location fees and non-positive multipliers are rejected"""
+        rules = requests.get(f"{BASE_URL}/api/admin/pricing-rules", headers=auth_headers).json()
+        rules.pop("version")
+        for invalid in [
+            {"location_fees": {"iasi_airport": "free"}},
+            {"location_fees": {"iasi_airport": -50}},
+            {"seasons": [{"start": "07-01", "end": "08-31", "multiplier": 0}]}
+        ]:
+            response = requests.put(
+                f"{BASE_URL}/api/admin/pricing-rules", json={**rules, **invalid}, headers=auth_headers
+            )
+            assert response.status_code == 422, f"{invalid} accepted: {response.text}"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
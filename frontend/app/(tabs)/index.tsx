@@ -6,7 +6,7 @@ import { useRouter } from 'expo-router';
 import { useAuth } from '../../src/context/AuthContext';
 import { useRental } from '../../src/context/RentalContext';
 import { useLanguage } from '../../src/context/LanguageContext';
-import { api } from '../../src/utils/api';
+import { api, imageUri } from '../../src/utils/api';
 import { Car } from '../../src/types';
 import CarCard from '../../src/components/CarCard';
 import RentalFilters from '../../src/components/RentalFilters';
@@ -185,7 +185,7 @@ export default function HomeScreen() {
           <View style={styles.bannerSection}>
             <Animated.View style={[styles.bannerContainer, { opacity: fadeAnim }]}>
               <Image
-                source={{ uri: currentBannerData.image }}
+                source={{ uri: imageUri(currentBannerData.image) }}
                 style={styles.bannerImage}
                 resizeMode="cover"
               />
@@ -6,7 +6,7 @@ import { Ionicons } from '@expo/vector-icons';
 import { useAuth } from '../../src/context/AuthContext';
 import { useRental } from '../../src/context/RentalContext';
 import { useLanguage } from '../../src/context/LanguageContext';
-import { api } from '../../src/utils/api';
+import { api, imageUri } from '../../src/utils/api';
 import { Car, PriceCalculation } from '../../src/types';
 
 const { width } = Dimensions.get('window');
@@ -229,6 +229,7 @@ export default function CarDetailScreen() {
         customer_name: customerName.trim(),
         customer_phone: customerPhone.trim(),
         customer_age: parseInt(customerAge),
+        quote_token: price?.quote_token,
       });
       
       setShowBookingModal(false);
@@ -288,7 +289,7 @@ export default function CarDetailScreen() {
               car.images.map((image, index) => (
                 <Image
                   key={index}
-                  source={{ uri: image }}
+                  source={{ uri: imageUri(image) }}
                   style={styles.galleryImage}
                   resizeMode="cover"
                 />
@@ -6,7 +6,7 @@ import { Car, PriceCalculation } from '../types';
 import { useRental } from '../context/RentalContext';
 import { useAuth } from '../context/AuthContext';
 import { useLanguage } from '../context/LanguageContext';
-import { api } from '../utils/api';
+import { api, imageUri } from '../utils/api';
 
 interface CarCardProps {
   car: Car;
@@ -135,7 +135,7 @@ export default function CarCard({ car }: CarCardProps) {
   return (
     <TouchableOpacity style={styles.card} onPress={handlePress} activeOpacity={0.8}>
       <Image
-        source={{ uri: mainImage }}
+        source={{ uri: imageUri(mainImage) }}
         style={styles.image}
         resizeMode="cover"
       />
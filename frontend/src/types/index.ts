@@ -77,6 +77,7 @@ export interface PriceCalculation {
     location: number;
     outside_hours: number;
   };
+  quote_token?: string;
 }
 
 export interface Booking {
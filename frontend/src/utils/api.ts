@@ -5,6 +5,10 @@ const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || 'https://swipe-gesture-qa
 
 export { API_URL };
 
+// Uploaded images are stored as paths on the backend (/api/images/<hash>)
+export const imageUri = (uri: string): string =>
+  uri && uri.startsWith('/') ? `${API_URL}${uri}` : uri;
+
 export const getAuthToken = async (): Promise<string | null> => {
   return await AsyncStorage.getItem('session_token');
 };
@@ -110,6 +114,7 @@ export const api = {
     customer_name: string;
     customer_phone: string;
     customer_age: number;
+    quote_token?: string;
   }) => apiCall('/bookings', {
     method: 'POST',
     body: JSON.stringify(data),